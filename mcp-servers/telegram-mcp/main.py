@@ -6,19 +6,26 @@ Refactored from monolithic main.py
 import asyncio
 import sys
 import sqlite3
-import nest_asyncio
 import os
 import mimetypes
+import tempfile
 import signal
 import atexit
+import logging
 from mcp.server.fastmcp import FastMCP
 from mcp.types import BlobResourceContents
 
+# pybase64 ships SIMD encoders; fall back to the stdlib when it isn't installed
+try:
+    import pybase64 as base64
+except ImportError:
+    import base64
+
 # Import configuration
 from telegram_mcp.config import client, logger
 
 # Import media storage
-from telegram_mcp.utils.media_storage import MediaStorage
+from telegram_mcp.utils.media_storage import MediaStorage, B64_SIDECAR_SUFFIX
 
 # Initialize MCP server
 mcp = FastMCP("telegram")
@@ -26,124 +33,190 @@ mcp = FastMCP("telegram")
 # Initialize media storage
 media_storage = MediaStorage()
 
-# Import all tool modules to register them
-from telegram_mcp.tools import chat_tools
-from telegram_mcp.tools import message_tools
-from telegram_mcp.tools import contact_tools
-from telegram_mcp.tools import media_tools
-from telegram_mcp.tools import admin_tools
-from telegram_mcp.tools import profile_tools
-from telegram_mcp.tools import misc_tools
-from telegram_mcp.tools import reaction_tools
+# Tool modules are loaded lazily by the package on first access
+from telegram_mcp import tools
 
-# Register all tools with the MCP server
-def register_tools():
-    """Register all tools from the various modules."""
-    
+# (module, function) pairs, in registration order
+TOOLS = (
     # Chat tools
-    mcp.tool()(chat_tools.telegram_get_chats)
-    mcp.tool()(chat_tools.telegram_list_chats)
-    mcp.tool()(chat_tools.telegram_get_chat)
-    mcp.tool()(chat_tools.telegram_read_channel)
-    mcp.tool()(chat_tools.telegram_create_group)
-    mcp.tool()(chat_tools.telegram_create_channel)
-    mcp.tool()(chat_tools.telegram_edit_chat_title)
-    mcp.tool()(chat_tools.telegram_edit_chat_photo)
-    mcp.tool()(chat_tools.telegram_delete_chat_photo)
-    mcp.tool()(chat_tools.telegram_leave_chat)
-    mcp.tool()(chat_tools.telegram_get_pending_chats)
-    mcp.tool()(chat_tools.telegram_get_direct_chat_by_contact)
-    mcp.tool()(chat_tools.telegram_get_contact_chats)
-    mcp.tool()(chat_tools.telegram_join_chat_by_link)
-    mcp.tool()(chat_tools.telegram_export_chat_invite)
-    mcp.tool()(chat_tools.telegram_import_chat_invite)
-    mcp.tool()(chat_tools.telegram_get_invite_link)
-    mcp.tool()(chat_tools.telegram_archive_chat)
-    mcp.tool()(chat_tools.telegram_unarchive_chat)
-    
+    ("chat_tools", "telegram_get_chats"),
+    ("chat_tools", "telegram_list_chats"),
+    ("chat_tools", "telegram_get_chat"),
+    ("chat_tools", "telegram_read_channel"),
+    ("chat_tools", "telegram_create_group"),
+    ("chat_tools", "telegram_create_channel"),
+    ("chat_tools", "telegram_edit_chat_title"),
+    ("chat_tools", "telegram_edit_chat_photo"),
+    ("chat_tools", "telegram_delete_chat_photo"),
+    ("chat_tools", "telegram_leave_chat"),
+    ("chat_tools", "telegram_get_pending_chats"),
+    ("chat_tools", "telegram_get_direct_chat_by_contact"),
+    ("chat_tools", "telegram_get_contact_chats"),
+    ("chat_tools", "telegram_join_chat_by_link"),
+    ("chat_tools", "telegram_export_chat_invite"),
+    ("chat_tools", "telegram_import_chat_invite"),
+    ("chat_tools", "telegram_get_invite_link"),
+    ("chat_tools", "telegram_archive_chat"),
+    ("chat_tools", "telegram_archive_chats"),
+    ("chat_tools", "telegram_unarchive_chat"),
+
     # Message tools
-    mcp.tool()(message_tools.telegram_get_messages)
-    mcp.tool()(message_tools.telegram_list_messages)
-    mcp.tool()(message_tools.telegram_send_message)
-    mcp.tool()(message_tools.telegram_reply_to_message)
-    mcp.tool()(message_tools.telegram_edit_message)
-    mcp.tool()(message_tools.telegram_delete_message)
-    mcp.tool()(message_tools.telegram_forward_message)
-    mcp.tool()(message_tools.telegram_pin_message)
-    mcp.tool()(message_tools.telegram_unpin_message)
-    mcp.tool()(message_tools.telegram_mark_as_read)
-    mcp.tool()(message_tools.telegram_get_message_context)
-    mcp.tool()(message_tools.telegram_search_messages)
-    mcp.tool()(message_tools.telegram_get_history)
-    mcp.tool()(message_tools.telegram_get_pinned_messages)
-    mcp.tool()(message_tools.telegram_create_poll)
-    
+    ("message_tools", "telegram_get_messages"),
+    ("message_tools", "telegram_list_messages"),
+    ("message_tools", "telegram_send_message"),
+    ("message_tools", "telegram_reply_to_message"),
+    ("message_tools", "telegram_edit_message"),
+    ("message_tools", "telegram_delete_message"),
+    ("message_tools", "telegram_forward_message"),
+    ("message_tools", "telegram_pin_message"),
+    ("message_tools", "telegram_unpin_message"),
+    ("message_tools", "telegram_mark_as_read"),
+    ("message_tools", "telegram_get_message_context"),
+    ("message_tools", "telegram_search_messages"),
+    ("message_tools", "telegram_get_history"),
+    ("message_tools", "telegram_get_pinned_messages"),
+    ("message_tools", "telegram_create_poll"),
+
     # Reaction tools
-    mcp.tool()(reaction_tools.telegram_react_to_message)
-    mcp.tool()(reaction_tools.telegram_unreact_message)
-    mcp.tool()(reaction_tools.telegram_get_message_reactions)
-    mcp.tool()(reaction_tools.telegram_get_reactors)
-    
+    ("reaction_tools", "telegram_react_to_message"),
+    ("reaction_tools", "telegram_unreact_message"),
+    ("reaction_tools", "telegram_get_message_reactions"),
+    ("reaction_tools", "telegram_get_reactors"),
+
     # Contact tools
-    mcp.tool()(contact_tools.telegram_list_contacts)
-    mcp.tool()(contact_tools.telegram_search_contacts)
-    # Deprecated registrations gated by env flag
-    if os.getenv("TELEGRAM_MCP_INCLUDE_DEPRECATED", "false").lower() in ("1", "true", "yes"): 
-        mcp.tool()(contact_tools.telegram_get_contact_ids)
-    mcp.tool()(contact_tools.telegram_add_contact)
-    mcp.tool()(contact_tools.telegram_delete_contact)
-    mcp.tool()(contact_tools.telegram_block_user)
-    mcp.tool()(contact_tools.telegram_unblock_user)
-    mcp.tool()(contact_tools.telegram_get_blocked_users)
-    mcp.tool()(contact_tools.telegram_import_contacts)
-    mcp.tool()(contact_tools.telegram_export_contacts)
-    mcp.tool()(contact_tools.telegram_get_last_interaction)
-    
+    ("contact_tools", "telegram_list_contacts"),
+    ("contact_tools", "telegram_search_contacts"),
+    ("contact_tools", "telegram_get_contact_ids"),
+    ("contact_tools", "telegram_add_contact"),
+    ("contact_tools", "telegram_delete_contact"),
+    ("contact_tools", "telegram_block_user"),
+    ("contact_tools", "telegram_block_users"),
+    ("contact_tools", "telegram_unblock_user"),
+    ("contact_tools", "telegram_get_blocked_users"),
+    ("contact_tools", "telegram_import_contacts"),
+    ("contact_tools", "telegram_export_contacts"),
+    ("contact_tools", "telegram_get_last_interaction"),
+
     # Media tools
-    mcp.tool()(media_tools.telegram_send_file)
-    mcp.tool()(media_tools.telegram_download_media)
-    mcp.tool()(media_tools.telegram_send_voice)
-    mcp.tool()(media_tools.telegram_send_sticker)
-    mcp.tool()(media_tools.telegram_send_gif)
-    mcp.tool()(media_tools.telegram_get_gif_search)
-    mcp.tool()(media_tools.telegram_get_media_info)
-    mcp.tool()(media_tools.telegram_get_sticker_sets)
-    mcp.tool()(media_tools.telegram_list_downloaded_media)
-    mcp.tool()(media_tools.telegram_clear_downloaded_media)
-    
+    ("media_tools", "telegram_send_file"),
+    ("media_tools", "telegram_send_files"),
+    ("media_tools", "telegram_download_media"),
+    ("media_tools", "telegram_download_media_batch"),
+    ("media_tools", "telegram_send_voice"),
+    ("media_tools", "telegram_send_sticker"),
+    ("media_tools", "telegram_send_gif"),
+    ("media_tools", "telegram_get_gif_search"),
+    ("media_tools", "telegram_get_media_info"),
+    ("media_tools", "telegram_get_sticker_sets"),
+    ("media_tools", "telegram_list_downloaded_media"),
+    ("media_tools", "telegram_clear_downloaded_media"),
+
     # Admin tools
-    mcp.tool()(admin_tools.telegram_get_participants)
-    mcp.tool()(admin_tools.telegram_invite_to_group)
-    mcp.tool()(admin_tools.telegram_promote_admin)
-    mcp.tool()(admin_tools.telegram_demote_admin)
-    mcp.tool()(admin_tools.telegram_ban_user)
-    mcp.tool()(admin_tools.telegram_unban_user)
-    mcp.tool()(admin_tools.telegram_get_admins)
-    mcp.tool()(admin_tools.telegram_get_banned_users)
-    mcp.tool()(admin_tools.telegram_get_recent_actions)
-    
+    ("admin_tools", "telegram_get_participants"),
+    ("admin_tools", "telegram_invite_to_group"),
+    ("admin_tools", "telegram_promote_admin"),
+    ("admin_tools", "telegram_demote_admin"),
+    ("admin_tools", "telegram_ban_user"),
+    ("admin_tools", "telegram_unban_user"),
+    ("admin_tools", "telegram_get_admins"),
+    ("admin_tools", "telegram_get_banned_users"),
+    ("admin_tools", "telegram_get_recent_actions"),
+
     # Profile tools
-    mcp.tool()(profile_tools.telegram_get_me)
-    mcp.tool()(profile_tools.telegram_update_profile)
-    mcp.tool()(profile_tools.telegram_set_profile_photo)
-    mcp.tool()(profile_tools.telegram_delete_profile_photo)
-    mcp.tool()(profile_tools.telegram_get_privacy_settings)
-    mcp.tool()(profile_tools.telegram_set_privacy_settings)
-    mcp.tool()(profile_tools.telegram_get_user_photos)
-    mcp.tool()(profile_tools.telegram_get_user_status)
-    
+    ("profile_tools", "telegram_get_me"),
+    ("profile_tools", "telegram_update_profile"),
+    ("profile_tools", "telegram_set_profile_photo"),
+    ("profile_tools", "telegram_delete_profile_photo"),
+    ("profile_tools", "telegram_get_privacy_settings"),
+    ("profile_tools", "telegram_set_privacy_settings"),
+    ("profile_tools", "telegram_get_user_photos"),
+    ("profile_tools", "telegram_get_user_status"),
+
     # Misc tools
-    mcp.tool()(misc_tools.telegram_mute_chat)
-    mcp.tool()(misc_tools.telegram_unmute_chat)
-    mcp.tool()(misc_tools.telegram_search_public_chats)
-    mcp.tool()(misc_tools.telegram_resolve_username)
-    mcp.tool()(misc_tools.telegram_get_bot_info)
-    mcp.tool()(misc_tools.telegram_set_bot_commands)
-    mcp.tool()(misc_tools.telegram_list_topics)
+    ("misc_tools", "telegram_mute_chat"),
+    ("misc_tools", "telegram_unmute_chat"),
+    ("misc_tools", "telegram_search_public_chats"),
+    ("misc_tools", "telegram_resolve_username"),
+    ("misc_tools", "telegram_get_bot_info"),
+    ("misc_tools", "telegram_set_bot_commands"),
+    ("misc_tools", "telegram_list_topics"),
+)
+
+# Only registered when TELEGRAM_MCP_INCLUDE_DEPRECATED is set
+DEPRECATED_TOOLS = frozenset({"telegram_get_contact_ids"})
+
+# Register all tools with the MCP server
+def register_tools():
+    """Register all tools from the various modules."""
+    include_deprecated = os.getenv("TELEGRAM_MCP_INCLUDE_DEPRECATED", "false").lower() in ("1", "true", "yes")
+    for module_name, function_name in TOOLS:
+        if function_name in DEPRECATED_TOOLS and not include_deprecated:
+            continue
+        mcp.tool()(getattr(getattr(tools, module_name), function_name))
 
 # Register all tools
 register_tools()
 
+# Read size for base64 encoding; a multiple of 3 so chunk encodings concatenate cleanly
+B64_CHUNK_SIZE = 3 * 64 * 1024
+
+# Persist base64 encodings next to media files so repeat reads skip re-encoding
+BASE64_CACHE_ENABLED = os.getenv("TELEGRAM_MCP_BASE64_CACHE", "false").lower() in ("1", "true", "yes")
+
+
+def _read_file_b64(file_path: str) -> tuple[str, int]:
+    """Read a file and base64-encode it chunk by chunk. Returns (encoded, raw_size)."""
+    with open(file_path, 'rb') as f:
+        # Encode into one preallocated buffer, reading through a single reused chunk buffer
+        size_hint = os.fstat(f.fileno()).st_size
+        encoded = bytearray(4 * ((size_hint + 2) // 3))
+        chunk = bytearray(B64_CHUNK_SIZE)
+        view = memoryview(chunk)
+        size = pos = 0
+        while n := f.readinto(chunk):
+            part = base64.b64encode(view[:n])
+            encoded[pos:pos + len(part)] = part
+            pos += len(part)
+            size += n
+        del encoded[pos:]
+    return encoded.decode('ascii'), size
+
+
+def _load_media_b64(file_path: str) -> tuple[str, int]:
+    """
+    Return the base64 encoding of a media file, using the on-disk sidecar cache when enabled.
+    
+    The sidecar is trusted only while it is at least as new as the media file.
+    """
+    if not BASE64_CACHE_ENABLED:
+        return _read_file_b64(file_path)
+    
+    sidecar_path = file_path + B64_SIDECAR_SUFFIX
+    media_stat = os.stat(file_path)
+    try:
+        if os.stat(sidecar_path).st_mtime >= media_stat.st_mtime:
+            with open(sidecar_path, 'r', encoding='ascii') as f:
+                return f.read(), media_stat.st_size
+    except OSError:
+        pass
+    
+    blob_b64, size = _read_file_b64(file_path)
+    
+    # Write via temp file + rename so concurrent readers never see a partial sidecar
+    try:
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(file_path), suffix=".tmp")
+        try:
+            with os.fdopen(fd, 'w', encoding='ascii') as f:
+                f.write(blob_b64)
+            os.replace(temp_path, sidecar_path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+    except OSError as e:
+        logger.warning(f"Failed to write base64 cache for {file_path}: {e}")
+    
+    return blob_b64, size
+
 # MCP Resource handler for Telegram media
 @mcp.resource("tgfile://{chat_id}/{message_id}")
 async def get_telegram_media(chat_id: str, message_id: str):
@@ -163,15 +236,11 @@ async def get_telegram_media(chat_id: str, message_id: str):
         if not os.path.exists(file_path):
             raise ValueError(f"Media file not found at {file_path}")
         
-        with open(file_path, 'rb') as f:
-            blob_data = f.read()
-        
-        # Encode blob as base64 string
-        import base64
-        blob_b64 = base64.b64encode(blob_data).decode('utf-8')
+        # Read and encode off the event loop so large media doesn't stall other requests
+        blob_b64, blob_size = await asyncio.to_thread(_load_media_b64, file_path)
         
         resource_uri = f"tgfile://{chat_id}/{message_id}"
-        logger.info(f"Serving media resource: {len(blob_data)} bytes, {media_info['mime_type']}")
+        logger.info(f"Serving media resource: {blob_size} bytes, {media_info['mime_type']}")
         return [BlobResourceContents(
             uri=resource_uri,
             blob=blob_b64,
@@ -182,10 +251,6 @@ async def get_telegram_media(chat_id: str, message_id: str):
         logger.error(f"Resource error {chat_id}/{message_id}: {e}")
         raise ValueError(f"Failed to serve media resource: {e}")
 
-# Global flag to track shutdown
-_shutdown_requested = False
-_shutdown_event = None
-
 async def cleanup():
     """Cleanup function to properly close the Telegram client."""
     try:
@@ -196,38 +261,70 @@ async def cleanup():
     except Exception as e:
         logger.error(f"Error during cleanup: {e}")
 
+def install_event_loop_policy() -> bool:
+    """
+    Switch asyncio to uvloop when it is installed and not disabled via TELEGRAM_MCP_UVLOOP.
+    
+    Returns:
+        True if the uvloop policy was installed
+    """
+    if os.getenv("TELEGRAM_MCP_UVLOOP", "true").lower() not in ("1", "true", "yes"):
+        return False
+    try:
+        import uvloop
+    except ImportError:
+        return False
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+    return True
+
 if __name__ == "__main__":
-    nest_asyncio.apply()
+    # nest_asyncio is only needed when embedding into an already-running loop; it also
+    # cannot patch uvloop loops, so enabling it keeps the default asyncio loop
+    if os.getenv("TELEGRAM_MCP_NEST_ASYNCIO", "false").lower() in ("1", "true", "yes"):
+        import nest_asyncio
+        nest_asyncio.apply()
+    else:
+        install_event_loop_policy()
+
+    async def serve() -> None:
+        # Start the Telethon client non-interactively
+        print("Starting Telegram client...")
+        await client.start()
+        print("Telegram client started. Running MCP server...")
+        # Use the asynchronous entrypoint instead of mcp.run()
+        await mcp.run_stdio_async()
 
     async def main() -> None:
-        global _shutdown_requested, _shutdown_event
-        
-        _shutdown_event = asyncio.Event()
+        loop = asyncio.get_running_loop()
+        server = asyncio.ensure_future(serve())
+        shutdown = asyncio.Event()
         
-        def signal_handler(sig, frame):
+        def request_shutdown(sig):
             """Handle shutdown signals gracefully."""
-            logger.info(f"Received signal {sig}, initiating shutdown...")
-            _shutdown_requested = True
-            if _shutdown_event:
-                _shutdown_event.set()
+            logger.info(f"Received signal {sig.name}, initiating shutdown...")
+            shutdown.set()
         
-        # Register signal handlers
-        signal.signal(signal.SIGINT, signal_handler)
-        signal.signal(signal.SIGTERM, signal_handler)
+        # Register signal handlers on the loop so they run as regular loop callbacks
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            try:
+                loop.add_signal_handler(sig, request_shutdown, sig)
+            except NotImplementedError:
+                # Windows loops lack add_signal_handler; hop back onto the loop thread instead
+                signal.signal(
+                    sig,
+                    lambda signum, frame: loop.call_soon_threadsafe(request_shutdown, signal.Signals(signum)),
+                )
         
         try:
-            # Start the Telethon client non-interactively
-            print("Starting Telegram client...")
-            await client.start()
-
-            if _shutdown_requested:
-                logger.info("Shutdown requested before server started")
-                await cleanup()
-                return
-
-            print("Telegram client started. Running MCP server...")
-            # Use the asynchronous entrypoint instead of mcp.run()
-            await mcp.run_stdio_async()
+            # Whichever finishes first wins: a signal cancels the server wherever it is,
+            # including mid client.start()
+            stop = asyncio.ensure_future(shutdown.wait())
+            await asyncio.wait((server, stop), return_when=asyncio.FIRST_COMPLETED)
+            if server.done():
+                stop.cancel()
+                server.result()
+            else:
+                server.cancel()
         except KeyboardInterrupt:
             logger.info("Interrupted by user")
         except Exception as e:
@@ -240,6 +337,11 @@ if __name__ == "__main__":
                 )
         finally:
             await cleanup()
-            sys.exit(0)
+            # The stdio reader thread stays blocked on stdin, and asyncio.run would wait for it
+            # (and for the cancelled server) forever; flush what we have and leave right away
+            logging.shutdown()
+            sys.stdout.flush()
+            sys.stderr.flush()
+            os._exit(0)
 
     asyncio.run(main())
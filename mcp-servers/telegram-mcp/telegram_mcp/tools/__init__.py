@@ -0,0 +1,27 @@
+"""
+Telegram MCP tool modules.
+
+Submodules are imported on first attribute access (PEP 562), so importing the
+package does not pull in every tool family up front.
+"""
+
+import importlib
+
+__all__ = [
+    "admin_tools",
+    "chat_tools",
+    "contact_tools",
+    "media_tools",
+    "message_tools",
+    "misc_tools",
+    "profile_tools",
+    "reaction_tools",
+]
+
+
+def __getattr__(name):
+    if name in __all__:
+        module = importlib.import_module(f".{name}", __name__)
+        globals()[name] = module
+        return module
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
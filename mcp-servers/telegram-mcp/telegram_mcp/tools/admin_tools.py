@@ -5,37 +5,140 @@ Auto-generated from main.py refactoring
 
 from mcp.server.fastmcp import FastMCP
 from telethon import TelegramClient, functions, utils
-from telethon.tl.types import *
+from telethon.tl.types import (
+    Channel,
+    ChatAdminRights,
+    ChatBannedRights,
+    ChannelParticipantsAdmins,
+    ChannelParticipantsKicked,
+    ChannelParticipantsRecent,
+)
 import telethon.errors.rpcerrorlist
-import logging
 import json
 import os
+import asyncio
+import operator
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Union, Any
 
 # Import shared utilities
-from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, get_entity_with_fallback
+from ..utils.helpers import (
+    format_entity,
+    format_message,
+    get_sender_name,
+    json_serializer,
+    get_entity_with_fallback,
+    invalidate_entity_cache,
+)
 from ..utils.errors import log_and_format_error, ErrorCategory
 
 # Import configuration
 from ..config import client, logger
 
-# Get logger
-logger = logging.getLogger("telegram_mcp")
+# Fields of an admin log event returned by telegram_get_recent_actions
+_get_event_fields = operator.attrgetter("id", "date", "action", "user_id")
+
+
+def _event_dict(event) -> dict:
+    """Summarize an AdminLogEvent straight from its attributes, without to_dict()."""
+    event_id, date, action, user_id = _get_event_fields(event)
+    return {
+        "id": event_id,
+        "date": date.isoformat() if date else None,
+        "action": type(action).__name__ if action is not None else None,
+        "user_id": user_id,
+    }
+
+
+# Admin rights granted by telegram_promote_admin when the caller doesn't override them
+_DEFAULT_ADMIN_FLAGS = {
+    "change_info": True,
+    "post_messages": True,
+    "edit_messages": True,
+    "delete_messages": True,
+    "ban_users": True,
+    "invite_users": True,
+    "pin_messages": True,
+    "add_admins": False,
+    "anonymous": False,
+    "manage_call": True,
+    "other": True,
+}
+
+# Shared, never-mutated rights objects so handlers don't rebuild them per call
+_DEFAULT_ADMIN_RIGHTS = ChatAdminRights(**_DEFAULT_ADMIN_FLAGS)
+_NO_ADMIN_RIGHTS = ChatAdminRights(**{flag: False for flag in _DEFAULT_ADMIN_FLAGS})
+_BANNED_RIGHTS = ChatBannedRights(
+    until_date=None,  # Ban forever
+    view_messages=True,
+    send_messages=True,
+    send_media=True,
+    send_stickers=True,
+    send_gifs=True,
+    send_games=True,
+    send_inline=True,
+    embed_links=True,
+    send_polls=True,
+    change_info=True,
+    invite_users=True,
+    pin_messages=True,
+)
+_UNBANNED_RIGHTS = ChatBannedRights(
+    until_date=None,
+    view_messages=False,
+    send_messages=False,
+    send_media=False,
+    send_stickers=False,
+    send_gifs=False,
+    send_games=False,
+    send_inline=False,
+    embed_links=False,
+    send_polls=False,
+    change_info=False,
+    invite_users=False,
+    pin_messages=False,
+)
+
+
+async def _resolve_chat_and_user(chat_id: int, user_id: int) -> tuple:
+    """Resolve a chat and a user concurrently.
+
+    If either lookup fails, its original exception is re-raised (the chat's first,
+    matching the old serial order) so callers still report which id was bad.
+    """
+    chat, user = await asyncio.gather(
+        get_entity_with_fallback(client, chat_id),
+        get_entity_with_fallback(client, user_id),
+        return_exceptions=True,
+    )
+    for resolved in (chat, user):
+        if isinstance(resolved, BaseException):
+            raise resolved
+    return chat, user
 
 
 async def telegram_invite_to_group(chat_id: int, user_ids: list[int]) -> dict:
     """Admin: Invite users to a chat by id."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
-        users_to_add = []
-
-        for user_id in user_ids:
-            try:
-                user = await get_entity_with_fallback(client, user_id)
-                users_to_add.append(user)
-            except ValueError as e:
-                return {"ok": False, "message": f"Error: User {user_id} not found. {e}"}
+        # Coerce once and drop duplicates (keeping order) so each user is resolved a single time
+        try:
+            unique_ids = list(dict.fromkeys(int(user_id) for user_id in user_ids))
+        except (TypeError, ValueError):
+            return {"ok": False, "message": f"Error: user_ids must be integer ids, got {user_ids!r}."}
+
+        # Resolve the chat and all users concurrently rather than one round-trip at a time
+        entity, *users_to_add = await asyncio.gather(
+            get_entity_with_fallback(client, chat_id),
+            *(get_entity_with_fallback(client, user_id) for user_id in unique_ids),
+            return_exceptions=True,
+        )
+        if isinstance(entity, BaseException):
+            raise entity
+        for user_id, user in zip(unique_ids, users_to_add):
+            if isinstance(user, ValueError):
+                return {"ok": False, "message": f"Error: User {user_id} not found. {user}"}
+            if isinstance(user, BaseException):
+                raise user
 
         try:
             result = await client(
@@ -50,6 +153,7 @@ async def telegram_invite_to_group(chat_id: int, user_ids: list[int]) -> dict:
 
             return {"ok": True, "message": f"Invited {invited_count} users to {getattr(entity, 'title', 'chat')}"}
         except telethon.errors.rpcerrorlist.UserNotMutualContactError:
+            invalidate_entity_cache(client, *unique_ids)
             return {"ok": False, "message": "Error: User not mutual contact; cannot invite."}
         except telethon.errors.rpcerrorlist.UserPrivacyRestrictedError:
             return {"ok": False, "message": "Error: User privacy restricts adding to chat."}
@@ -66,15 +170,46 @@ async def telegram_invite_to_group(chat_id: int, user_ids: list[int]) -> dict:
 
 
 
+async def _get_participants_page(chat_id: int, offset: int, limit: int, participants_filter=None) -> list:
+    """
+    Return one page of participant entities for a chat.
+
+    Channels and supergroups let Telegram apply the offset server-side; basic groups
+    always return their full member list, so those are sliced locally.
+    """
+    entity = await get_entity_with_fallback(client, chat_id)
+    if isinstance(entity, Channel):
+        result = await client(
+            functions.channels.GetParticipantsRequest(
+                channel=entity,
+                filter=participants_filter or ChannelParticipantsRecent(),
+                offset=offset,
+                limit=limit,
+                hash=0,
+            )
+        )
+        entities = {utils.get_peer_id(e): e for e in (*result.users, *result.chats)}
+        page = []
+        for participant in result.participants:
+            # Banned/left participants carry a peer, everyone else a user_id
+            peer = getattr(participant, "peer", None)
+            peer_id = utils.get_peer_id(peer) if peer is not None else participant.user_id
+            if peer_id in entities:
+                page.append(entities[peer_id])
+        return page
+
+    participants = await client.get_participants(entity, filter=participants_filter, limit=offset + limit)
+    return participants[offset : offset + limit]
+
+
+
+
 async def telegram_get_participants(chat_id: int, limit: int = 10, offset: int = 0) -> list[dict]:
     """Admin: List chat participants as JSON (paginated)."""
     try:
         capped_limit = max(1, min(limit, 50))
         start = max(0, int(offset or 0))
-        fetch_count = start + capped_limit
-        # Telethon versions may not accept 'offset'; emulate by over-fetching then slicing
-        participants = await client.get_participants(chat_id, limit=fetch_count)
-        sliced = participants[start : start + capped_limit]
+        sliced = await _get_participants_page(chat_id, start, capped_limit)
         return [format_entity(p) for p in sliced]
     except Exception as e:
         return {"error": log_and_format_error("telegram_get_participants", e, chat_id=chat_id)}
@@ -85,38 +220,15 @@ async def telegram_get_participants(chat_id: int, limit: int = 10, offset: int =
 async def telegram_promote_admin(chat_id: int, user_id: int, rights: dict | None = None) -> dict:
     """Admin: Promote a user to admin."""
     try:
-        chat = await get_entity_with_fallback(client, chat_id)
-        user = await get_entity_with_fallback(client, user_id)
+        chat, user = await _resolve_chat_and_user(chat_id, user_id)
 
-        # Set default admin rights if not provided
+        # Use default admin rights if not provided; custom rights fall back per flag
         if not rights:
-            rights = {
-                "change_info": True,
-                "post_messages": True,
-                "edit_messages": True,
-                "delete_messages": True,
-                "ban_users": True,
-                "invite_users": True,
-                "pin_messages": True,
-                "add_admins": False,
-                "anonymous": False,
-                "manage_call": True,
-                "other": True,
-            }
-
-        admin_rights = ChatAdminRights(
-            change_info=rights.get("change_info", True),
-            post_messages=rights.get("post_messages", True),
-            edit_messages=rights.get("edit_messages", True),
-            delete_messages=rights.get("delete_messages", True),
-            ban_users=rights.get("ban_users", True),
-            invite_users=rights.get("invite_users", True),
-            pin_messages=rights.get("pin_messages", True),
-            add_admins=rights.get("add_admins", False),
-            anonymous=rights.get("anonymous", False),
-            manage_call=rights.get("manage_call", True),
-            other=rights.get("other", True),
-        )
+            admin_rights = _DEFAULT_ADMIN_RIGHTS
+        else:
+            admin_rights = ChatAdminRights(
+                **{flag: rights.get(flag, default) for flag, default in _DEFAULT_ADMIN_FLAGS.items()}
+            )
 
         try:
             result = await client(
@@ -126,6 +238,7 @@ async def telegram_promote_admin(chat_id: int, user_id: int, rights: dict | None
             )
             return {"ok": True, "message": f"Promoted {user_id} to admin in {getattr(chat, 'title', 'chat')}"}
         except telethon.errors.rpcerrorlist.UserNotMutualContactError:
+            invalidate_entity_cache(client, user_id)
             return {"ok": False, "message": "Error: User not mutual contact; cannot promote."}
         except Exception as e:
             return {"ok": False, "message": log_and_format_error("telegram_promote_admin", e, chat_id=chat_id, user_id=user_id)}
@@ -143,32 +256,17 @@ async def telegram_promote_admin(chat_id: int, user_id: int, rights: dict | None
 async def telegram_demote_admin(chat_id: int, user_id: int) -> dict:
     """Admin: Demote a user from admin."""
     try:
-        chat = await get_entity_with_fallback(client, chat_id)
-        user = await get_entity_with_fallback(client, user_id)
-
-        # Create empty admin rights (regular user)
-        admin_rights = ChatAdminRights(
-            change_info=False,
-            post_messages=False,
-            edit_messages=False,
-            delete_messages=False,
-            ban_users=False,
-            invite_users=False,
-            pin_messages=False,
-            add_admins=False,
-            anonymous=False,
-            manage_call=False,
-            other=False,
-        )
+        chat, user = await _resolve_chat_and_user(chat_id, user_id)
 
         try:
             result = await client(
                 functions.channels.EditAdminRequest(
-                    channel=chat, user_id=user, admin_rights=admin_rights, rank=""
+                    channel=chat, user_id=user, admin_rights=_NO_ADMIN_RIGHTS, rank=""
                 )
             )
             return {"ok": True, "message": f"Demoted {user_id} from admin in {getattr(chat, 'title', 'chat')}"}
         except telethon.errors.rpcerrorlist.UserNotMutualContactError:
+            invalidate_entity_cache(client, user_id)
             return {"ok": False, "message": "Error: User not mutual contact; cannot change admin."}
         except Exception as e:
             return {"ok": False, "message": log_and_format_error("telegram_demote_admin", e, chat_id=chat_id, user_id=user_id)}
@@ -186,34 +284,17 @@ async def telegram_demote_admin(chat_id: int, user_id: int) -> dict:
 async def telegram_ban_user(chat_id: int, user_id: int) -> dict:
     """Admin: Ban a user from a chat."""
     try:
-        chat = await get_entity_with_fallback(client, chat_id)
-        user = await get_entity_with_fallback(client, user_id)
-
-        # Create banned rights (all restrictions enabled)
-        banned_rights = ChatBannedRights(
-            until_date=None,  # Ban forever
-            view_messages=True,
-            send_messages=True,
-            send_media=True,
-            send_stickers=True,
-            send_gifs=True,
-            send_games=True,
-            send_inline=True,
-            embed_links=True,
-            send_polls=True,
-            change_info=True,
-            invite_users=True,
-            pin_messages=True,
-        )
+        chat, user = await _resolve_chat_and_user(chat_id, user_id)
 
         try:
             await client(
                 functions.channels.EditBannedRequest(
-                    channel=chat, participant=user, banned_rights=banned_rights
+                    channel=chat, participant=user, banned_rights=_BANNED_RIGHTS
                 )
             )
             return {"ok": True, "message": f"Banned {user_id} from {getattr(chat, 'title', 'chat')}."}
         except telethon.errors.rpcerrorlist.UserNotMutualContactError:
+            invalidate_entity_cache(client, user_id)
             return {"ok": False, "message": "Error: User not mutual contact; cannot ban."}
         except Exception as e:
             return {"ok": False, "message": log_and_format_error("telegram_ban_user", e, chat_id=chat_id, user_id=user_id)}
@@ -227,34 +308,17 @@ async def telegram_ban_user(chat_id: int, user_id: int) -> dict:
 async def telegram_unban_user(chat_id: int, user_id: int) -> dict:
     """Admin: Unban a user from a chat."""
     try:
-        chat = await get_entity_with_fallback(client, chat_id)
-        user = await get_entity_with_fallback(client, user_id)
-
-        # Create unbanned rights (no restrictions)
-        unbanned_rights = ChatBannedRights(
-            until_date=None,
-            view_messages=False,
-            send_messages=False,
-            send_media=False,
-            send_stickers=False,
-            send_gifs=False,
-            send_games=False,
-            send_inline=False,
-            embed_links=False,
-            send_polls=False,
-            change_info=False,
-            invite_users=False,
-            pin_messages=False,
-        )
+        chat, user = await _resolve_chat_and_user(chat_id, user_id)
 
         try:
             await client(
                 functions.channels.EditBannedRequest(
-                    channel=chat, participant=user, banned_rights=unbanned_rights
+                    channel=chat, participant=user, banned_rights=_UNBANNED_RIGHTS
                 )
             )
             return {"ok": True, "message": f"Unbanned {user_id} in {getattr(chat, 'title', 'chat')}."}
         except telethon.errors.rpcerrorlist.UserNotMutualContactError:
+            invalidate_entity_cache(client, user_id)
             return {"ok": False, "message": "Error: User not mutual contact; cannot unban."}
         except Exception as e:
             return {"ok": False, "message": log_and_format_error("telegram_unban_user", e, chat_id=chat_id, user_id=user_id)}
@@ -270,11 +334,7 @@ async def telegram_get_admins(chat_id: int, limit: int = 10, offset: int = 0) ->
     try:
         capped_limit = max(1, min(limit, 50))
         start = max(0, int(offset or 0))
-        fetch_count = start + capped_limit
-        participants = await client.get_participants(
-            chat_id, filter=ChannelParticipantsAdmins(), limit=fetch_count
-        )
-        sliced = participants[start : start + capped_limit]
+        sliced = await _get_participants_page(chat_id, start, capped_limit, ChannelParticipantsAdmins())
         return [format_entity(p) for p in sliced]
     except Exception as e:
         logger.exception(f"telegram_get_admins failed (chat_id={chat_id})")
@@ -288,11 +348,7 @@ async def telegram_get_banned_users(chat_id: int, limit: int = 10, offset: int =
     try:
         capped_limit = max(1, min(limit, 50))
         start = max(0, int(offset or 0))
-        fetch_count = start + capped_limit
-        participants = await client.get_participants(
-            chat_id, filter=ChannelParticipantsKicked(q=""), limit=fetch_count
-        )
-        sliced = participants[start : start + capped_limit]
+        sliced = await _get_participants_page(chat_id, start, capped_limit, ChannelParticipantsKicked(q=""))
         return [format_entity(p) for p in sliced]
     except Exception as e:
         logger.exception(f"telegram_get_banned_users failed (chat_id={chat_id})")
@@ -305,26 +361,8 @@ async def telegram_get_recent_actions(chat_id: int, limit: int = 10) -> list[dic
     """Admin: List recent admin actions (paginated)."""
     try:
         capped_limit = max(1, min(limit, 50))
-        result = await client(
-            functions.channels.GetAdminLogRequest(
-                channel=chat_id, q="", events_filter=None, admins=[], max_id=0, min_id=0, limit=capped_limit
-            )
-        )
-
-        if not result or not result.events:
-            return []
-
-        # Use the custom serializer to handle datetime objects; compact each event
-        events = []
-        for e in result.events:
-            ed = e.to_dict()
-            events.append({
-                "id": ed.get("id"),
-                "date": ed.get("date").isoformat() if ed.get("date") else None,
-                "action": ed.get("action", {}).get("_"),
-                "user_id": ed.get("user_id"),
-            })
-        return events
+        # iter_admin_log builds the request itself and stops once capped_limit events are read
+        return [_event_dict(e) async for e in client.iter_admin_log(chat_id, limit=capped_limit)]
     except Exception as e:
         logger.exception(f"telegram_get_recent_actions failed (chat_id={chat_id})")
         return {"error": log_and_format_error("telegram_get_recent_actions", e, chat_id=chat_id)}
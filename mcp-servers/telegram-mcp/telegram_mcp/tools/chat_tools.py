@@ -4,13 +4,35 @@ Chats: Core chat listing, lookup, membership and invites (concise, JSON returns)
 
 from mcp.server.fastmcp import FastMCP
 from telethon import TelegramClient, functions, utils
+from telethon.tl.functions.messages import (
+    CheckChatInviteRequest,
+    ExportChatInviteRequest,
+    GetFullChatRequest,
+    ImportChatInviteRequest,
+)
 from telethon.tl.types import *
+from telethon.tl.types.messages import InvitedUsers
+from telethon.errors import (
+    InviteHashEmptyError,
+    InviteHashExpiredError,
+    InviteHashInvalidError,
+    InviteRequestSentError,
+    UserAlreadyParticipantError,
+    ChatAdminRequiredError,
+    UsersTooMuchError,
+)
 import telethon.errors.rpcerrorlist
 import logging
 import json
 import os
+import re
 import asyncio
-from datetime import datetime, timedelta
+import base64
+import functools
+import heapq
+import itertools
+import time
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Union, Any
 
 # Import shared utilities
@@ -18,11 +40,17 @@ from ..utils.helpers import (
     format_entity,
     format_message,
     get_sender_name,
+    get_entity_name,
     json_serializer,
+    json_dumps,
     format_dialog_summary,
     get_entity_kind,
     truncate,
     get_entity_with_fallback,
+    get_input_entity_with_fallback,
+    get_me_cached,
+    invalidate_entity_cache,
+    run_batch,
 )
 from ..utils.errors import log_and_format_error, ErrorCategory
 
@@ -32,35 +60,139 @@ from ..config import client, logger
 # Get logger
 logger = logging.getLogger("telegram_mcp")
 
+# Upper bound on concurrent get_messages calls made by telegram_get_pending_chats
+PENDING_CONTEXT_CONCURRENCY = 8
+
+# Peers sent per messages.GetPeerDialogsRequest
+PEER_DIALOGS_BATCH_SIZE = 100
+
+# Sort key for chats without a last message; aware, so it compares with Telethon's UTC dates
+_MIN_DATE = datetime.min.replace(tzinfo=timezone.utc)
+
+# Display type for pending chats, keyed by exact entity class (megagroups handled separately)
+_PENDING_CHAT_TYPES = {User: "Private", Chat: "Group"}
+
+# Dialog folder that Telegram clients show as "Archived chats"; folder 0 is the main list
+ARCHIVE_FOLDER_ID = 1
+
+# Exported invite links are reused for this many seconds (or until they expire, if sooner)
+INVITE_LINK_CACHE_TTL = 300.0
+
+# peer id -> (expires_at, link)
+_invite_link_cache: Dict[int, tuple] = {}
+
+# peer id -> export in progress, shared by concurrent callers; entries leave once it finishes
+_invite_link_inflight: Dict[int, asyncio.Future] = {}
+
+# Plain-text replies for expected ImportChatInviteRequest failures
+_JOIN_ERROR_MESSAGES = {
+    "expired": "The invite hash has expired and is no longer valid.",
+    "invalid": "The invite hash is invalid or malformed.",
+    "already": "You are already a member of this chat.",
+    "admin": "Cannot join this chat - requires admin approval.",
+    "full": "Cannot join this chat - it has reached maximum number of participants.",
+}
+
+# Known error classes, checked in order
+_JOIN_ERROR_TYPES = (
+    (InviteHashExpiredError, "expired"),
+    ((InviteHashInvalidError, InviteHashEmptyError), "invalid"),
+    (UserAlreadyParticipantError, "already"),
+    ((ChatAdminRequiredError, InviteRequestSentError), "admin"),
+    (UsersTooMuchError, "full"),
+)
+
+# Other errors are classified from their text: one scan collects every keyword present,
+# then the first kind below whose keywords all appear wins (same order as _JOIN_ERROR_TYPES)
+_JOIN_ERROR_RE = re.compile(
+    r"(?P<expired>expired)|(?P<invalid>invalid)|(?P<already>already)|(?P<participant>participant)"
+    r"|(?P<admin>admin)|(?P<full>too[\s_]+(?:much|many))",
+    re.IGNORECASE,
+)
+_JOIN_ERROR_KEYWORDS = (
+    ("expired", {"expired"}),
+    ("invalid", {"invalid"}),
+    ("already", {"already", "participant"}),
+    ("admin", {"admin"}),
+    ("full", {"full"}),
+)
+
 
-async def telegram_get_chats(page: int = 1, page_size: int = 10) -> str:
-    """List chats as JSON summaries (paged). Broadcast channels are excluded."""
+def _join_error_message(join_err: Exception) -> Optional[str]:
+    """Map an ImportChatInviteRequest failure to a plain-text reply, or None if unexpected."""
+    for error_types, kind in _JOIN_ERROR_TYPES:
+        if isinstance(join_err, error_types):
+            return _JOIN_ERROR_MESSAGES[kind]
+    found = {match.lastgroup for match in _JOIN_ERROR_RE.finditer(str(join_err))}
+    for kind, keywords in _JOIN_ERROR_KEYWORDS:
+        if keywords <= found:
+            return _JOIN_ERROR_MESSAGES[kind]
+    return None
+
+
+def _encode_dialog_cursor(dialog) -> Optional[str]:
+    """Pack the GetDialogs offset after `dialog` into an opaque cursor string."""
+    message = dialog.message
+    if not message or not message.date:
+        return None
+    entity = dialog.entity
+    state = {
+        "d": int(message.date.timestamp()),
+        "i": message.id,
+        "p": utils.get_peer_id(entity),
+        "h": getattr(entity, "access_hash", None) or 0,
+    }
+    return base64.urlsafe_b64encode(json.dumps(state, separators=(",", ":")).encode()).decode()
+
+
+def _decode_dialog_cursor(cursor: str) -> tuple:
+    """Unpack a cursor into (offset_date, offset_id, offset_peer) without any lookups."""
+    try:
+        state = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+        offset_date = datetime.fromtimestamp(state["d"], tz=timezone.utc)
+        real_id, peer_type = utils.resolve_id(int(state["p"]))
+        access_hash = int(state["h"])
+    except (ValueError, TypeError, KeyError) as e:
+        raise ValueError(f"Invalid cursor: {cursor}") from e
+    if peer_type is PeerUser:
+        offset_peer = InputPeerUser(real_id, access_hash)
+    elif peer_type is PeerChannel:
+        offset_peer = InputPeerChannel(real_id, access_hash)
+    else:
+        offset_peer = InputPeerChat(real_id)
+    return offset_date, int(state["i"]), offset_peer
+
+
+async def telegram_get_chats(page: int = 1, page_size: int = 10, cursor: Optional[str] = None) -> str:
+    """List chats as JSON summaries (paged). Broadcast channels are excluded. Pass a page's next_cursor as cursor to fetch the following page without re-reading earlier ones."""
     try:
         # Enforce sane limits
         page = max(1, int(page))
         page_size = max(1, min(int(page_size), 200))
         
-        # Calculate how many dialogs to skip
-        skip_count = (page - 1) * page_size
-        
         # Fetch dialogs with offset, getting extra to account for filtered broadcast channels
         # We fetch more than needed because some may be filtered out
         fetch_limit = page_size + 50  # Buffer for filtered items
-        offset_dialogs = []
         offset_date = None
         offset_id = 0
         offset_peer = None
-        skipped = 0
         
-        # Skip to the right page
-        if skip_count > 0:
-            temp_dialogs = await client.get_dialogs(limit=skip_count + 1)
-            if len(temp_dialogs) > skip_count:
-                last = temp_dialogs[skip_count]
-                if last.message:
-                    offset_date = last.message.date
-                    offset_id = last.message.id
-                    offset_peer = last.entity
+        if cursor:
+            # The cursor already holds the offset, so no probe request is needed
+            offset_date, offset_id, offset_peer = _decode_dialog_cursor(cursor)
+        else:
+            # Calculate how many dialogs to skip
+            skip_count = (page - 1) * page_size
+            
+            # Skip to the right page
+            if skip_count > 0:
+                temp_dialogs = await client.get_dialogs(limit=skip_count + 1)
+                if len(temp_dialogs) > skip_count:
+                    last = temp_dialogs[skip_count]
+                    if last.message:
+                        offset_date = last.message.date
+                        offset_id = last.message.id
+                        offset_peer = last.entity
         
         # Fetch the actual page
         if offset_peer is not None:
@@ -73,19 +205,18 @@ async def telegram_get_chats(page: int = 1, page_size: int = 10) -> str:
         else:
             dialogs = await client.get_dialogs(limit=fetch_limit)
         
-        # Filter out broadcast channels
-        filtered_dialogs = [d for d in dialogs if get_entity_kind(d.entity) is not None]
-        
-        # Return only the requested page_size
-        chats = filtered_dialogs[:page_size]
-        payload = {
-            "items": [format_dialog_summary(d) for d in chats],
-            "page": page,
-            "page_size": page_size,
-        }
-        return json.dumps(payload, indent=2, default=json_serializer)
+        # Filter out broadcast channels, keeping only the requested page_size
+        chats = list(itertools.islice(
+            (d for d in dialogs if get_entity_kind(d.entity) is not None), page_size
+        ))
+        payload = {"items": [format_dialog_summary(d) for d in chats]}
+        if not cursor:
+            payload["page"] = page
+        payload["page_size"] = page_size
+        payload["next_cursor"] = _encode_dialog_cursor(chats[-1]) if len(chats) == page_size else None
+        return json_dumps(payload)
     except Exception as e:
-        return log_and_format_error("telegram_get_chats", e)
+        return log_and_format_error("telegram_get_chats", e, page=page, cursor=cursor)
 
 
 
@@ -96,79 +227,34 @@ async def telegram_list_chats(chat_type: str = None, limit: int = 10) -> str:
         # Enforce sane limit
         limit = max(1, min(int(limit), 200))
         
-        results = []
-        offset_date = None
-        offset_id = 0
-        offset_peer = None
-        total_checked = 0
-        batch_size = 100  # Increased from 50 to reduce API calls for higher limits
-        max_total_checked = 500  # Safety limit to prevent infinite loops
+        max_total_checked = 500  # Safety limit to prevent scanning the whole dialog list
         
         # Normalize chat_type - "channel" is an alias for both user and group
         filter_types = None
         if chat_type:
             chat_type_lower = chat_type.lower()
             if chat_type_lower == "channel":
-                filter_types = ["user", "group"]
+                filter_types = frozenset(("user", "group"))
             else:
-                filter_types = [chat_type_lower]
+                filter_types = frozenset((chat_type_lower,))
         
         # If no chat_type filter, just fetch the requested limit directly
         if not filter_types:
             dialogs = await client.get_dialogs(limit=limit)
-            for dialog in dialogs:
+            # Skip broadcast channels (kind will be None)
+            results = [format_dialog_summary(d) for d in dialogs if get_entity_kind(d.entity) is not None]
+        else:
+            # With chat_type filter, walk dialogs lazily and stop as soon as we have enough matches
+            results = []
+            async for dialog in client.iter_dialogs(limit=max_total_checked):
                 kind = get_entity_kind(dialog.entity)
-                # Skip broadcast channels (kind will be None)
-                if kind is not None:
+                # Skip broadcast channels (kind will be None) and check if matches filter
+                if kind is not None and kind in filter_types:
                     results.append(format_dialog_summary(dialog))
-        else:
-            # With chat_type filter, fetch in batches until we have enough matches
-            while len(results) < limit and total_checked < max_total_checked:
-                # Fetch a batch of dialogs
-                # Only pass offset parameters if they're set (not on first iteration)
-                if offset_peer is not None:
-                    batch = await client.get_dialogs(
-                        limit=batch_size,
-                        offset_date=offset_date,
-                        offset_id=offset_id,
-                        offset_peer=offset_peer
-                    )
-                else:
-                    batch = await client.get_dialogs(limit=batch_size)
-                
-                # If no more dialogs, break
-                if not batch:
-                    break
-                
-                # Filter and collect matching dialogs
-                for dialog in batch:
-                    entity = dialog.entity
-                    kind = get_entity_kind(entity)
-                    # Skip broadcast channels (kind will be None) and check if matches filter
-                    if kind is not None and kind in filter_types:
-                        results.append(format_dialog_summary(dialog))
-                        # Stop if we've collected enough
-                        if len(results) >= limit:
-                            break
-                
-                total_checked += len(batch)
-                
-                # If we got fewer dialogs than requested, we've reached the end
-                if len(batch) < batch_size:
-                    break
-                
-                # Update offset for next batch
-                # Use the last dialog's message for offset, or skip offset if no message
-                last_dialog = batch[-1]
-                if last_dialog.message:
-                    offset_date = last_dialog.message.date
-                    offset_id = last_dialog.message.id
-                    offset_peer = last_dialog.entity
-                else:
-                    # If there's no message, we can't properly paginate, so stop
-                    break
+                    if len(results) >= limit:
+                        break
 
-        return json.dumps({"items": results, "limit": limit}, indent=2, default=json_serializer)
+        return json_dumps({"items": results, "limit": limit})
     except Exception as e:
         return log_and_format_error("telegram_list_chats", e, chat_type=chat_type, limit=limit)
 
@@ -178,7 +264,8 @@ async def telegram_list_chats(chat_type: str = None, limit: int = 10) -> str:
 async def telegram_get_chat(chat_id: int) -> str:
     """Get a chat by id as a JSON object with basic stats. Note: broadcast channels will have kind=null as they are not supported."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        # Titles and member counts can change from other clients, so fetch them live
+        entity = await get_entity_with_fallback(client, chat_id, remember_failure=True, fresh=True)
         result = {"id": entity.id, "kind": get_entity_kind(entity)}
 
         is_channel = isinstance(entity, Channel)
@@ -189,8 +276,14 @@ async def telegram_get_chat(chat_id: int) -> str:
             result["name"] = entity.title
             result["username"] = getattr(entity, "username", None)
             try:
-                participants_count = (await client.get_participants(entity, limit=0)).total
-                result["participants"] = participants_count
+                # Basic groups carry the count on the entity; channels report it in their full info
+                if is_channel:
+                    full = await client(functions.channels.GetFullChannelRequest(channel=entity))
+                    participants_count = full.full_chat.participants_count
+                else:
+                    participants_count = getattr(entity, "participants_count", None)
+                if participants_count is not None:
+                    result["participants"] = participants_count
             except Exception:
                 pass
 
@@ -204,15 +297,23 @@ async def telegram_get_chat(chat_id: int) -> str:
                 "verified": bool(getattr(entity, "verified", False)),
             })
 
-        # Get last activity if it's a dialog
+        # Get last activity if it's a dialog; ask for this peer's dialog directly
         try:
-            dialog = await client.get_dialogs(limit=1, offset_id=0, offset_peer=entity)
-            if dialog:
-                dialog = dialog[0]
+            peer_dialogs = await client(
+                functions.messages.GetPeerDialogsRequest(
+                    peers=[InputDialogPeer(peer=utils.get_input_peer(entity))]
+                )
+            )
+            if peer_dialogs.dialogs:
+                dialog = peer_dialogs.dialogs[0]
                 result["unread"] = getattr(dialog, "unread_count", 0) or 0
-                if dialog.message:
-                    last_msg = dialog.message
-                    sender_name = get_sender_name(last_msg)
+                last_msg = next((m for m in peer_dialogs.messages if m.id == dialog.top_message), None)
+                if last_msg:
+                    # The sender comes back in the users/chats of the same response
+                    entities = {
+                        utils.get_peer_id(x): x for x in (*peer_dialogs.users, *peer_dialogs.chats)
+                    }
+                    sender_name = get_entity_name(entities.get(last_msg.sender_id))
                     result["last_message"] = {
                         "id": last_msg.id,
                         "from": sender_name,
@@ -222,7 +323,7 @@ async def telegram_get_chat(chat_id: int) -> str:
         except Exception as diag_ex:
             logger.warning(f"Could not get dialog info for {chat_id}: {diag_ex}")
 
-        return json.dumps(result, indent=2, default=json_serializer)
+        return json_dumps(result)
     except Exception as e:
         return log_and_format_error("telegram_get_chat", e, chat_id=chat_id)
 
@@ -247,6 +348,35 @@ async def telegram_read_channel(
 
 
 
+async def _fetch_context_lines(semaphore: asyncio.Semaphore, entity, context_messages: int) -> list[str]:
+    """Format a pending chat's recent messages oldest-first; never raises."""
+    try:
+        async with semaphore:
+            recent_messages = await client.get_messages(entity, limit=context_messages)
+        
+        message_lines = []
+        sender_names = {}  # sender_id -> display name, so each sender is formatted once
+        for msg in recent_messages[::-1]:  # Show oldest first for chronological order
+            if msg.out:
+                sender_name = "You"
+            else:
+                sender_name = sender_names.get(msg.sender_id)
+                if sender_name is None:
+                    sender_name = sender_names[msg.sender_id] = get_sender_name(msg)
+            # Truncate long messages; media-only messages get a placeholder
+            text = msg.message
+            message_text = text[:97] + "..." if text and len(text) > 100 else (text or "[Media/No text]")
+            
+            # isoformat is C-implemented; the slice drops the UTC offset to keep "YYYY-MM-DD HH:MM"
+            sent_at = msg.date.isoformat(sep=" ", timespec="minutes")[:16]
+            message_lines.append(f"- ID: {msg.id} | {sender_name} | {sent_at} | {message_text}")
+        return message_lines
+    except Exception as msg_error:
+        # If we can't get messages, still include the chat but note the error
+        logger.warning(f"Could not fetch messages for chat {entity.id}: {msg_error}")
+        return ["- [Error fetching recent messages]"]
+
+
 async def telegram_get_pending_chats(
     limit: int = 10,
     context_messages: int = 5,
@@ -256,19 +386,18 @@ async def telegram_get_pending_chats(
     """List chats needing attention (unread or last inbound), with recent context as JSON."""
     try:
         # Get current user info to identify own messages
-        me = await client.get_me()
+        me = await get_me_cached(client)
         my_id = me.id
         
-        # Fetch all dialogs
-        dialogs = await client.get_dialogs()
-        
         pending_chats = []
+        now = datetime.now(timezone.utc)
         
-        for dialog in dialogs:
+        # Walk dialogs lazily so we stop requesting batches once `limit` chats are found
+        async for dialog in client.iter_dialogs():
             entity = dialog.entity
             
             # Filter by chat type: only private chats and groups (exclude broadcast channels)
-            if isinstance(entity, Channel) and not entity.megagroup:
+            if type(entity) is Channel and not entity.megagroup:
                 continue  # Skip broadcast channels, but include groups (megagroups are groups)
             
             # Apply archive filter
@@ -281,84 +410,46 @@ async def telegram_get_pending_chats(
                 notify_settings = dialog.notify_settings
                 if (hasattr(notify_settings, 'mute_until') and 
                     notify_settings.mute_until and 
-                    notify_settings.mute_until > datetime.now()):
+                    notify_settings.mute_until > now):
                     continue
             
-            # Check if chat is pending (has unread messages OR last message is from someone else)
-            is_pending = False
-            
-            # Criterion 1: Has unread messages
-            if dialog.unread_count > 0:
-                is_pending = True
-            
-            # Criterion 2: Last message was from someone else (not user)
-            elif dialog.message and not dialog.message.out:
-                is_pending = True
+            # Pending: has unread messages, or the last message is from someone else
+            is_pending = dialog.unread_count > 0 or (dialog.message is not None and not dialog.message.out)
             
             if is_pending:
                 # Get chat type for display
-                if isinstance(entity, User):
-                    chat_type = "Private"
-                elif isinstance(entity, Chat):
-                    chat_type = "Group"
-                elif isinstance(entity, Channel) and entity.megagroup:
-                    chat_type = "Group"
-                else:
-                    chat_type = "Unknown"
+                chat_type = _PENDING_CHAT_TYPES.get(type(entity)) or (
+                    "Group" if isinstance(entity, Channel) and entity.megagroup else "Unknown"
+                )
                 
                 # Get chat name
                 chat_name = getattr(entity, "title", None) or getattr(entity, "first_name", "Unknown")
                 if hasattr(entity, "last_name") and entity.last_name:
                     chat_name += f" {entity.last_name}"
                 
-                # Get recent messages for context
-                try:
-                    recent_messages = await client.get_messages(entity, limit=context_messages)
-                    
-                    message_lines = []
-                    for msg in reversed(recent_messages):  # Show oldest first for chronological order
-                        sender_name = "You" if msg.out else get_sender_name(msg)
-                        message_text = msg.message or "[Media/No text]"
-                        # Truncate long messages
-                        if len(message_text) > 100:
-                            message_text = message_text[:97] + "..."
-                        
-                        message_lines.append(
-                            f"- ID: {msg.id} | {sender_name} | {msg.date.strftime('%Y-%m-%d %H:%M')} | {message_text}"
-                        )
-                    
-                    chat_info = {
-                        'entity': entity,
-                        'chat_name': chat_name,
-                        'chat_type': chat_type,
-                        'unread_count': dialog.unread_count,
-                        'message_lines': message_lines,
-                        'last_message_date': dialog.message.date if dialog.message else None
-                    }
-                    
-                    pending_chats.append(chat_info)
-                    
-                except Exception as msg_error:
-                    # If we can't get messages, still include the chat but note the error
-                    logger.warning(f"Could not fetch messages for chat {entity.id}: {msg_error}")
-                    chat_info = {
-                        'entity': entity,
-                        'chat_name': chat_name,
-                        'chat_type': chat_type,
-                        'unread_count': dialog.unread_count,
-                        'message_lines': ["- [Error fetching recent messages]"],
-                        'last_message_date': dialog.message.date if dialog.message else None
-                    }
-                    pending_chats.append(chat_info)
+                pending_chats.append({
+                    'entity': entity,
+                    'chat_name': chat_name,
+                    'chat_type': chat_type,
+                    'unread_count': dialog.unread_count,
+                    'last_message_date': dialog.message.date if dialog.message else None
+                })
             
             # Stop if we've reached the limit
             if len(pending_chats) >= limit:
                 break
         
-        # Sort by last message date (most recent first)
-        pending_chats.sort(
-            key=lambda x: x['last_message_date'] or datetime.min,
-            reverse=True
+        # Fetch recent messages for context from all pending chats concurrently
+        semaphore = asyncio.Semaphore(PENDING_CONTEXT_CONCURRENCY)
+        context_lines = await asyncio.gather(
+            *(_fetch_context_lines(semaphore, chat_info['entity'], context_messages) for chat_info in pending_chats)
+        )
+        for chat_info, message_lines in zip(pending_chats, context_lines):
+            chat_info['message_lines'] = message_lines
+        
+        # Keep the most recent `limit` chats, newest first
+        pending_chats = heapq.nlargest(
+            limit, pending_chats, key=lambda x: x['last_message_date'] or _MIN_DATE
         )
 
         # Emit JSON
@@ -374,7 +465,7 @@ async def telegram_get_pending_chats(
                 "last_message_date": chat_info['last_message_date'].isoformat() if chat_info['last_message_date'] else None,
             })
 
-        return json.dumps({"items": payload}, indent=2, default=json_serializer)
+        return json_dumps({"items": payload})
         
     except Exception as e:
         return log_and_format_error(
@@ -389,6 +480,22 @@ async def telegram_get_pending_chats(
 
 
 
+async def _get_peer_dialogs(entities) -> dict:
+    """Fetch the dialogs of specific peers, keyed by peer id; peers without a dialog are left out."""
+    dialogs = {}
+    for start in range(0, len(entities), PEER_DIALOGS_BATCH_SIZE):
+        batch = entities[start:start + PEER_DIALOGS_BATCH_SIZE]
+        result = await client(
+            functions.messages.GetPeerDialogsRequest(
+                peers=[InputDialogPeer(peer=utils.get_input_peer(entity)) for entity in batch]
+            )
+        )
+        for dialog in result.dialogs:
+            if dialog.top_message:
+                dialogs[utils.get_peer_id(dialog.peer)] = dialog
+    return dialogs
+
+
 async def telegram_get_direct_chat_by_contact(contact_query: str) -> str:
     """Find direct chats for contacts matching a query; returns JSON list."""
     try:
@@ -411,24 +518,24 @@ async def telegram_get_direct_chat_by_contact(contact_query: str) -> str:
             ):
                 found_contacts.append(contact)
         if not found_contacts:
-            return json.dumps({"items": []}, indent=2)
-        # If we found contacts, look for direct chats with them
+            return json_dumps({"items": []})
+        # If we found contacts, look up just their dialogs instead of scanning every dialog
         results = []
-        dialogs = await client.get_dialogs()
+        dialogs = await _get_peer_dialogs(found_contacts)
         for contact in found_contacts:
+            dialog = dialogs.get(contact.id)
+            if dialog is None:
+                continue
             contact_name = (
                 f"{getattr(contact, 'first_name', '')} {getattr(contact, 'last_name', '')}".strip()
             )
-            for dialog in dialogs:
-                if isinstance(dialog.entity, User) and dialog.entity.id == contact.id:
-                    results.append({
-                        "id": dialog.entity.id,
-                        "contact": contact_name,
-                        "username": getattr(contact, "username", None),
-                        "unread": getattr(dialog, "unread_count", 0) or 0,
-                    })
-                    break
-        return json.dumps({"items": results}, indent=2, default=json_serializer)
+            results.append({
+                "id": contact.id,
+                "contact": contact_name,
+                "username": getattr(contact, "username", None),
+                "unread": getattr(dialog, "unread_count", 0) or 0,
+            })
+        return json_dumps({"items": results})
     except Exception as e:
         return log_and_format_error("telegram_get_direct_chat_by_contact", e, contact_query=contact_query)
 
@@ -447,17 +554,12 @@ async def telegram_get_contact_chats(contact_id: int) -> str:
             f"{getattr(contact, 'first_name', '')} {getattr(contact, 'last_name', '')}".strip()
         )
 
-        # Find direct chat
-        direct_chat = None
-        dialogs = await client.get_dialogs()
-
         results = {"contact": {"id": contact.id, "name": contact_name}, "direct": None, "common": []}
 
-        # Look for direct chat
-        for dialog in dialogs:
-            if isinstance(dialog.entity, User) and dialog.entity.id == contact_id:
-                results["direct"] = {"id": dialog.entity.id, "kind": "private", "unread": getattr(dialog, "unread_count", 0) or 0}
-                break
+        # Look for direct chat by asking for this peer's dialog only
+        dialog = (await _get_peer_dialogs([contact])).get(contact.id)
+        if dialog is not None:
+            results["direct"] = {"id": contact.id, "kind": "private", "unread": getattr(dialog, "unread_count", 0) or 0}
 
         # Look for common groups (broadcast channels excluded)
         common_chats = []
@@ -472,25 +574,47 @@ async def telegram_get_contact_chats(contact_id: int) -> str:
         except:
             results.append("Could not retrieve common groups.")
 
-        return json.dumps(results, indent=2, default=json_serializer)
+        return json_dumps(results)
     except Exception as e:
         return log_and_format_error("telegram_get_contact_chats", e, contact_id=contact_id)
 
 
 
 
+def _created_chat_id(result) -> Optional[int]:
+    """Pull the new chat's id out of a CreateChatRequest response without another request."""
+    updates = result.updates if isinstance(result, InvitedUsers) else result
+    chats = getattr(updates, "chats", None)
+    if chats:
+        return chats[0].id
+    for update in getattr(updates, "updates", None) or ():
+        participants = getattr(update, "participants", None)
+        if isinstance(update, UpdateChatParticipants) and participants is not None:
+            return participants.chat_id
+        message = getattr(update, "message", None)
+        if isinstance(getattr(message, "action", None), MessageActionChatCreate):
+            return message.peer_id.chat_id
+    # Older layers returned the chat directly
+    chat = getattr(result, "chat", None)
+    if chat:
+        return chat.id
+    return getattr(result, "chat_id", None)
+
+
 async def telegram_create_group(title: str, user_ids: list) -> str:
     """Create a basic group with users; returns ok/message."""
     try:
-        # Convert user IDs to entities
-        users = []
-        for user_id in user_ids:
-            try:
-                user = await get_entity_with_fallback(client, user_id)
-                users.append(user)
-            except Exception as e:
-                logger.error(f"Failed to get entity for user ID {user_id}: {e}")
+        # Convert user IDs to entities, resolving them concurrently
+        users = await asyncio.gather(
+            *(get_entity_with_fallback(client, user_id) for user_id in user_ids),
+            return_exceptions=True,
+        )
+        for user_id, user in zip(user_ids, users):
+            if isinstance(user, Exception):
+                logger.error(f"Failed to get entity for user ID {user_id}: {user}")
                 return f"Error: Could not find user with ID {user_id}"
+            if isinstance(user, BaseException):
+                raise user
 
         if not users:
             return "Error: No valid users provided"
@@ -500,25 +624,13 @@ async def telegram_create_group(title: str, user_ids: list) -> str:
             # Create a new chat with selected users
             result = await client(functions.messages.CreateChatRequest(users=users, title=title))
 
-            # Check what type of response we got
-            if hasattr(result, "chats") and result.chats:
-                created_chat = result.chats[0]
-                return json.dumps({"ok": True, "message": f"Group created", "id": created_chat.id})
-            elif hasattr(result, "chat") and result.chat:
-                return json.dumps({"ok": True, "message": "Group created", "id": result.chat.id})
-            elif hasattr(result, "chat_id"):
-                return json.dumps({"ok": True, "message": "Group created", "id": result.chat_id})
-            else:
-                # If we can't determine the chat ID directly from the result
-                # Try to find it in recent dialogs
-                await asyncio.sleep(1)  # Give Telegram a moment to register the new group
-                dialogs = await client.get_dialogs(limit=5)  # Get recent dialogs
-                for dialog in dialogs:
-                    if dialog.title == title:
-                        return json.dumps({"ok": True, "message": "Group created", "id": dialog.id})
+            # The new chat comes back inside the response (messages.InvitedUsers wraps the Updates)
+            chat_id = _created_chat_id(result)
+            if chat_id is not None:
+                return json_dumps({"ok": True, "message": "Group created", "id": chat_id})
 
-                # If we still can't find it, at least return success
-                return json.dumps({"ok": True, "message": f"Group created. Check recent chats for '{title}'."})
+            # If we can't determine the chat ID from the response, at least return success
+            return json_dumps({"ok": True, "message": f"Group created. Check recent chats for '{title}'."})
 
         except Exception as create_err:
             if "PEER_FLOOD" in str(create_err):
@@ -535,33 +647,35 @@ async def telegram_create_group(title: str, user_ids: list) -> str:
 async def telegram_leave_chat(chat_id: int) -> str:
     """Leave a group by id; returns ok/message. Broadcast channels are not supported."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_entity_with_fallback(client, chat_id, remember_failure=True)
 
         # Check the entity type carefully
         if isinstance(entity, Channel):
             # Check if it's a broadcast channel (not supported)
             if getattr(entity, "broadcast", False):
-                return json.dumps({"ok": False, "error": "Leaving broadcast channels is not supported"})
+                return json_dumps({"ok": False, "error": "Leaving broadcast channels is not supported"})
             # Handle groups (supergroups are Channel type in Telegram API)
             try:
                 await client(functions.channels.LeaveChannelRequest(channel=entity))
-                chat_name = getattr(entity, "title", str(chat_id))
-                return json.dumps({"ok": True, "message": f"Left group {chat_name}", "id": chat_id})
+                invalidate_entity_cache(client, chat_id)
+                chat_name = entity.title
+                return json_dumps({"ok": True, "message": f"Left group {chat_name}", "id": chat_id})
             except Exception as chan_err:
                 return log_and_format_error("telegram_leave_chat", chan_err, chat_id=chat_id)
 
         elif isinstance(entity, Chat):
             # Traditional basic groups
             try:
-                # First try with InputPeerUser
-                me = await client.get_me(input_peer=True)
+                # First try with InputUser, derived from the cached self user (no extra request)
+                me = utils.get_input_user(await get_me_cached(client))
                 await client(
                     functions.messages.DeleteChatUserRequest(
                         chat_id=entity.id, user_id=me  # Use the entity ID directly
                     )
                 )
-                chat_name = getattr(entity, "title", str(chat_id))
-                return json.dumps({"ok": True, "message": f"Left basic group {chat_name}", "id": chat_id})
+                invalidate_entity_cache(client, chat_id)
+                chat_name = entity.title
+                return json_dumps({"ok": True, "message": f"Left basic group {chat_name}", "id": chat_id})
             except Exception as chat_err:
                 # If the above fails, try the second approach
                 logger.warning(
@@ -570,14 +684,15 @@ async def telegram_leave_chat(chat_id: int) -> str:
 
                 try:
                     # Alternative approach - sometimes this works better
-                    me_full = await client.get_me()
+                    me_full = await get_me_cached(client)
                     await client(
                         functions.messages.DeleteChatUserRequest(
                             chat_id=entity.id, user_id=me_full.id
                         )
                     )
-                    chat_name = getattr(entity, "title", str(chat_id))
-                    return json.dumps({"ok": True, "message": f"Left basic group {chat_name}", "id": chat_id})
+                    invalidate_entity_cache(client, chat_id)
+                    chat_name = entity.title
+                    return json_dumps({"ok": True, "message": f"Left basic group {chat_name}", "id": chat_id})
                 except Exception as alt_err:
                     return log_and_format_error("telegram_leave_chat", alt_err, chat_id=chat_id)
         else:
@@ -616,7 +731,7 @@ async def telegram_create_channel(title: str, about: str = "", megagroup: bool =
         result = await client(
             functions.channels.CreateChannelRequest(title=title, about=about, megagroup=megagroup)
         )
-        return json.dumps({"ok": True, "message": f"Channel '{title}' created", "id": result.chats[0].id})
+        return json_dumps({"ok": True, "message": f"Channel '{title}' created", "id": result.chats[0].id})
     except Exception as e:
         return log_and_format_error(
             "create_channel", e, title=title, about=about, megagroup=megagroup
@@ -635,7 +750,8 @@ async def telegram_edit_chat_title(chat_id: int, title: str) -> str:
             await client(functions.messages.EditChatTitleRequest(chat_id=chat_id, title=title))
         else:
             return f"Cannot edit title for this entity type ({type(entity)})."
-        return json.dumps({"ok": True, "message": f"Title updated", "id": chat_id, "title": title})
+        invalidate_entity_cache(client, chat_id)
+        return json_dumps({"ok": True, "message": f"Title updated", "id": chat_id, "title": title})
     except Exception as e:
         logger.exception(f"telegram_edit_chat_title failed (chat_id={chat_id}, title='{title}')")
         return log_and_format_error("telegram_edit_chat_title", e, chat_id=chat_id, title=title)
@@ -667,7 +783,8 @@ async def telegram_edit_chat_photo(chat_id: int, file_path: str) -> str:
         else:
             return f"Cannot edit photo for this entity type ({type(entity)})."
 
-        return json.dumps({"ok": True, "message": "Photo updated", "id": chat_id})
+        invalidate_entity_cache(client, chat_id)
+        return json_dumps({"ok": True, "message": "Photo updated", "id": chat_id})
     except Exception as e:
         logger.exception(f"telegram_edit_chat_photo failed (chat_id={chat_id}, file_path='{file_path}')")
         return log_and_format_error("telegram_edit_chat_photo", e, chat_id=chat_id, file_path=file_path)
@@ -694,7 +811,8 @@ async def telegram_delete_chat_photo(chat_id: int) -> str:
         else:
             return f"Cannot delete photo for this entity type ({type(entity)})."
 
-        return json.dumps({"ok": True, "message": "Photo deleted", "id": chat_id})
+        invalidate_entity_cache(client, chat_id)
+        return json_dumps({"ok": True, "message": "Photo deleted", "id": chat_id})
     except Exception as e:
         logger.exception(f"telegram_delete_chat_photo failed (chat_id={chat_id})")
         return log_and_format_error("telegram_delete_chat_photo", e, chat_id=chat_id)
@@ -702,42 +820,82 @@ async def telegram_delete_chat_photo(chat_id: int) -> str:
 
 
 
+async def _export_invite_link(entity) -> str:
+    """Export an invite link for `entity`, reusing a recent link for the same chat.
+
+    Raises the error from the fallback export if no link could be obtained.
+    """
+    peer_id = utils.get_peer_id(entity)
+    cached = _invite_link_cache.get(peer_id)
+    if cached is not None and cached[0] > time.monotonic():
+        return cached[1]
+
+    # Concurrent exports for one chat wait on a single request
+    task = _invite_link_inflight.get(peer_id)
+    if task is None:
+        task = asyncio.ensure_future(_fetch_invite_link(entity, peer_id))
+        _invite_link_inflight[peer_id] = task
+        task.add_done_callback(functools.partial(_finish_invite_export, peer_id))
+    # Shielded so one caller being cancelled doesn't cancel the export for the others
+    return await asyncio.shield(task)
+
+
+def _finish_invite_export(peer_id: int, task: asyncio.Future) -> None:
+    """Forget a finished export, marking its error as retrieved in case every waiter was cancelled."""
+    _invite_link_inflight.pop(peer_id, None)
+    if not task.cancelled():
+        task.exception()
+
+
+async def _fetch_invite_link(entity, peer_id: int) -> str:
+    """Export a fresh invite link for `entity` and cache it under `peer_id`."""
+    expires_at = time.monotonic() + INVITE_LINK_CACHE_TTL
+
+    # Try using ExportChatInviteRequest first
+    try:
+        result = await client(ExportChatInviteRequest(peer=entity))
+        link = result.link
+        expire_date = getattr(result, "expire_date", None)
+        if expire_date is not None:
+            remaining = (expire_date - datetime.now(timezone.utc)).total_seconds()
+            expires_at = min(expires_at, time.monotonic() + remaining)
+    except AttributeError:
+        # If the function doesn't exist in the current Telethon version
+        logger.warning("ExportChatInviteRequest not available, using alternative method")
+        link = None
+    except Exception as e1:
+        # If that fails, log and try alternative approach
+        logger.warning(f"ExportChatInviteRequest failed: {e1}")
+        link = None
+
+    # Alternative approach using client.export_chat_invite_link
+    if link is None:
+        link = await client.export_chat_invite_link(entity)
+
+    _invite_link_cache[peer_id] = (expires_at, link)
+    return link
+
+
 async def telegram_get_invite_link(chat_id: int) -> str:
     """Get an invite link for a chat; returns the link as string (JSON)."""
     try:
         entity = await get_entity_with_fallback(client, chat_id)
 
-        # Try using ExportChatInviteRequest first
-        try:
-            from telethon.tl import functions
-
-            result = await client(functions.messages.ExportChatInviteRequest(peer=entity))
-            return json.dumps({"link": result.link})
-        except AttributeError:
-            # If the function doesn't exist in the current Telethon version
-            logger.warning("ExportChatInviteRequest not available, using alternative method")
-        except Exception as e1:
-            # If that fails, log and try alternative approach
-            logger.warning(f"ExportChatInviteRequest failed: {e1}")
-
-        # Alternative approach using client.export_chat_invite_link
         try:
-            invite_link = await client.export_chat_invite_link(entity)
-            return json.dumps({"link": invite_link})
+            return json_dumps({"link": await _export_invite_link(entity)})
         except Exception as e2:
             logger.exception(f"telegram_export_chat_invite_link failed: {e2}")
 
         # Last resort: Try directly fetching chat info
         try:
             if isinstance(entity, (Chat, Channel)):
-                full_chat = await client(functions.messages.GetFullChatRequest(chat_id=entity.id))
-                if hasattr(full_chat, "full_chat") and hasattr(full_chat.full_chat, "invite_link"):
-                    link = full_chat.full_chat.invite_link or None
-                    return json.dumps({"link": link})
+                full_chat = await client(GetFullChatRequest(chat_id=entity.id))
+                exported_invite = full_chat.full_chat.exported_invite
+                return json_dumps({"link": exported_invite.link if exported_invite else None})
         except Exception as e3:
             logger.warning(f"GetFullChatRequest failed: {e3}")
 
-        return json.dumps({"link": None})
+        return json_dumps({"link": None})
     except Exception as e:
         logger.exception(f"telegram_get_invite_link failed (chat_id={chat_id})")
         return log_and_format_error("telegram_get_invite_link", e, chat_id=chat_id)
@@ -745,6 +903,33 @@ async def telegram_get_invite_link(chat_id: int) -> str:
 
 
 
+async def _join_by_hash(hash_part: str) -> str:
+    """Join a chat by invite hash; returns the tool response for both invite-join tools."""
+    # Try to check invite info first (will often fail if not a member)
+    try:
+        invite_info = await client(CheckChatInviteRequest(hash=hash_part))
+        if isinstance(invite_info, ChatInviteAlready):
+            # Telegram only returns the chat itself when we're already a member
+            return json_dumps({"ok": True, "message": f"Already a member of {invite_info.chat.title}"})
+    except Exception:
+        # This often fails if not a member - just continue
+        pass
+
+    # Join the chat using the hash
+    try:
+        result = await client(ImportChatInviteRequest(hash=hash_part))
+    except Exception as join_err:
+        message = _join_error_message(join_err)
+        if message is None:
+            raise  # Re-raise to be caught by the caller's exception handler
+        return message
+    try:
+        chat_title = result.chats[0].title
+    except (AttributeError, IndexError, TypeError):
+        return json_dumps({"ok": True, "message": "Joined via invite"})
+    return json_dumps({"ok": True, "message": f"Joined {chat_title}"})
+
+
 async def telegram_join_chat_by_link(link: str) -> str:
     """Join a chat by invite link; returns ok/message."""
     try:
@@ -756,47 +941,7 @@ async def telegram_join_chat_by_link(link: str) -> str:
         else:
             hash_part = link
 
-        # Try checking the invite before joining
-        try:
-            from telethon.errors import (
-                InviteHashExpiredError,
-                InviteHashInvalidError,
-                UserAlreadyParticipantError,
-                ChatAdminRequiredError,
-                UsersTooMuchError,
-            )
-
-            # Try to check invite info first (will often fail if not a member)
-            invite_info = await client(functions.messages.CheckChatInviteRequest(hash=hash_part))
-            if hasattr(invite_info, "chat") and invite_info.chat:
-                # If we got chat info, we're already a member
-                chat_title = getattr(invite_info.chat, "title", "Unknown Chat")
-                return json.dumps({"ok": True, "message": f"Already a member of {chat_title}"})
-        except Exception as check_err:
-            # This often fails if not a member - just continue
-            pass
-
-        # Join the chat using the hash
-        try:
-            result = await client(functions.messages.ImportChatInviteRequest(hash=hash_part))
-            if result and hasattr(result, "chats") and result.chats:
-                chat_title = getattr(result.chats[0], "title", "Unknown Chat")
-                return json.dumps({"ok": True, "message": f"Joined {chat_title}"})
-            return json.dumps({"ok": True, "message": "Joined via invite"})
-        except Exception as join_err:
-            err_str = str(join_err).lower()
-            if "expired" in err_str:
-                return "The invite hash has expired and is no longer valid."
-            elif "invalid" in err_str:
-                return "The invite hash is invalid or malformed."
-            elif "already" in err_str and "participant" in err_str:
-                return "You are already a member of this chat."
-            elif "admin" in err_str:
-                return "Cannot join this chat - requires admin approval."
-            elif "too much" in err_str or "too many" in err_str:
-                return "Cannot join this chat - it has reached maximum number of participants."
-            else:
-                raise  # Re-raise to be caught by the outer exception handler
+        return await _join_by_hash(hash_part)
     except Exception as e:
         logger.exception(f"telegram_join_chat_by_link failed (link={link})")
         return log_and_format_error("telegram_join_chat_by_link", e, link=link)
@@ -809,23 +954,8 @@ async def telegram_export_chat_invite(chat_id: int) -> str:
     try:
         entity = await get_entity_with_fallback(client, chat_id)
 
-        # Try using ExportChatInviteRequest first
         try:
-            from telethon.tl import functions
-
-            result = await client(functions.messages.ExportChatInviteRequest(peer=entity))
-            return json.dumps({"link": result.link})
-        except AttributeError:
-            # If the function doesn't exist in the current Telethon version
-            logger.warning("ExportChatInviteRequest not available, using alternative method")
-        except Exception as e1:
-            # If that fails, log and try alternative approach
-            logger.warning(f"ExportChatInviteRequest failed: {e1}")
-
-        # Alternative approach using client.export_chat_invite_link
-        try:
-            invite_link = await client.export_chat_invite_link(entity)
-            return json.dumps({"link": invite_link})
+            return json_dumps({"link": await _export_invite_link(entity)})
         except Exception as e2:
             logger.exception(f"telegram_export_chat_invite_link failed: {e2}")
             return log_and_format_error("telegram_export_chat_invite", e2, chat_id=chat_id)
@@ -843,47 +973,7 @@ async def telegram_import_chat_invite(hash: str) -> str:
         if hash.startswith("+"):
             hash = hash[1:]
 
-        # Try checking the invite before joining
-        try:
-            from telethon.errors import (
-                InviteHashExpiredError,
-                InviteHashInvalidError,
-                UserAlreadyParticipantError,
-                ChatAdminRequiredError,
-                UsersTooMuchError,
-            )
-
-            # Try to check invite info first (will often fail if not a member)
-            invite_info = await client(functions.messages.CheckChatInviteRequest(hash=hash))
-            if hasattr(invite_info, "chat") and invite_info.chat:
-                # If we got chat info, we're already a member
-                chat_title = getattr(invite_info.chat, "title", "Unknown Chat")
-                return json.dumps({"ok": True, "message": f"Already a member of {chat_title}"})
-        except Exception as check_err:
-            # This often fails if not a member - just continue
-            pass
-
-        # Join the chat using the hash
-        try:
-            result = await client(functions.messages.ImportChatInviteRequest(hash=hash))
-            if result and hasattr(result, "chats") and result.chats:
-                chat_title = getattr(result.chats[0], "title", "Unknown Chat")
-                return json.dumps({"ok": True, "message": f"Joined {chat_title}"})
-            return json.dumps({"ok": True, "message": "Joined via invite"})
-        except Exception as join_err:
-            err_str = str(join_err).lower()
-            if "expired" in err_str:
-                return "The invite hash has expired and is no longer valid."
-            elif "invalid" in err_str:
-                return "The invite hash is invalid or malformed."
-            elif "already" in err_str and "participant" in err_str:
-                return "You are already a member of this chat."
-            elif "admin" in err_str:
-                return "Cannot join this chat - requires admin approval."
-            elif "too much" in err_str or "too many" in err_str:
-                return "Cannot join this chat - it has reached maximum number of participants."
-            else:
-                raise  # Re-raise to be caught by the outer exception handler
+        return await _join_by_hash(hash)
     except Exception as e:
         logger.exception(f"telegram_import_chat_invite failed (hash={hash})")
         return log_and_format_error("telegram_import_chat_invite", e, hash=hash)
@@ -891,30 +981,47 @@ async def telegram_import_chat_invite(hash: str) -> str:
 
 
 
+async def _set_dialog_archived(chat_id: int, archived: bool) -> None:
+    """Move one chat into (True) or out of (False) the Archive folder; shared by the archive/unarchive tools."""
+    peer = await get_input_entity_with_fallback(client, chat_id)
+    await client(
+        functions.folders.EditPeerFoldersRequest(
+            folder_peers=[InputFolderPeer(peer=peer, folder_id=ARCHIVE_FOLDER_ID if archived else 0)]
+        )
+    )
+
+
 async def telegram_archive_chat(chat_id: int) -> str:
     """Archive a chat; returns ok/message."""
     try:
-        await client(
-            functions.messages.ToggleDialogPinRequest(
-                peer=await get_entity_with_fallback(client, chat_id), pinned=True
-            )
-        )
-        return json.dumps({"ok": True, "message": "Archived", "id": chat_id})
+        await _set_dialog_archived(chat_id, True)
+        return json_dumps({"ok": True, "message": "Archived", "id": chat_id})
     except Exception as e:
         return log_and_format_error("telegram_archive_chat", e, chat_id=chat_id)
 
 
 
 
+async def telegram_archive_chats(chat_ids: list[int]) -> str:
+    """Archive several chats concurrently; returns ok/archived ids/per-chat errors."""
+    try:
+        archived, failed = await run_batch(lambda chat_id: _set_dialog_archived(chat_id, True), chat_ids)
+        errors = [
+            {"id": chat_id, "error": log_and_format_error("telegram_archive_chats", err, chat_id=chat_id)}
+            for chat_id, err in failed
+        ]
+        return json_dumps({"ok": not errors, "archived": archived, "errors": errors})
+    except Exception as e:
+        return log_and_format_error("telegram_archive_chats", e, chat_ids=chat_ids)
+
+
+
+
 async def telegram_unarchive_chat(chat_id: int) -> str:
     """Unarchive a chat; returns ok/message."""
     try:
-        await client(
-            functions.messages.ToggleDialogPinRequest(
-                peer=await get_entity_with_fallback(client, chat_id), pinned=False
-            )
-        )
-        return json.dumps({"ok": True, "message": "Unarchived", "id": chat_id})
+        await _set_dialog_archived(chat_id, False)
+        return json_dumps({"ok": True, "message": "Unarchived", "id": chat_id})
     except Exception as e:
         return log_and_format_error("telegram_unarchive_chat", e, chat_id=chat_id)
 
@@ -5,16 +5,28 @@ Auto-generated from main.py refactoring
 
 from mcp.server.fastmcp import FastMCP
 from telethon import TelegramClient, functions, utils
+from telethon.tl.functions.contacts import (
+    BlockRequest,
+    DeleteContactsRequest,
+    GetBlockedRequest,
+    GetContactsRequest,
+    ImportContactsRequest,
+    SearchRequest,
+    UnblockRequest,
+)
 from telethon.tl.types import *
+from telethon.tl.types import InputPhoneContact
+from telethon.tl.types.contacts import BlockedSlice, ContactsNotModified
 import telethon.errors.rpcerrorlist
 import logging
 import json
 import os
+import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Union, Any
 
 # Import shared utilities
-from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, get_entity_with_fallback
+from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, get_entity_with_fallback, get_input_entity_with_fallback, run_batch
 from ..utils.errors import log_and_format_error, ErrorCategory
 
 # Import configuration
@@ -23,6 +35,82 @@ from ..config import client, logger
 # Get logger
 logger = logging.getLogger("telegram_mcp")
 
+# Contacts sent per contacts.ImportContactsRequest
+IMPORT_CONTACTS_BATCH_SIZE = 100
+
+# Last contact list fetched; its hash lets Telegram answer "not modified" without a payload.
+# get_contact_ids serves it without any request for CONTACTS_CACHE_TTL seconds after a fetch.
+CONTACTS_CACHE_TTL = 30.0
+_contacts_cache: Dict[str, Any] = {"hash": 0, "users": [], "expires_at": 0.0}
+
+# Telegram hashes at most this many contact ids
+CONTACTS_HASH_MAX_IDS = 100000
+
+# Blocked users are fetched in pages of this size and served from memory for BLOCKED_CACHE_TTL seconds
+BLOCKED_PAGE_SIZE = 200
+BLOCKED_CACHE_TTL = 30.0
+_blocked_cache: Dict[str, Any] = {"users": [], "expires_at": 0.0}
+
+
+def _contacts_hash(saved_count: int, user_ids) -> int:
+    """Telegram's 64-bit contacts.getContacts hash, as a signed long.
+
+    Seeded with the saved_count of the previous contacts.contacts response, followed by the sorted contact ids.
+    """
+    h = 0
+    for user_id in (saved_count, *sorted(user_ids)[:CONTACTS_HASH_MAX_IDS]):
+        h ^= h >> 21
+        h ^= (h << 35) & 0xFFFFFFFFFFFFFFFF
+        h ^= h >> 4
+        h = (h + user_id) & 0xFFFFFFFFFFFFFFFF
+    return h - (1 << 64) if h >= 1 << 63 else h
+
+
+def _invalidate_contacts() -> None:
+    """Forget the cached contact list so the next fetch downloads it in full."""
+    _contacts_cache["hash"] = 0
+    _contacts_cache["users"] = []
+    _contacts_cache["expires_at"] = 0.0
+
+
+async def _get_contacts() -> list:
+    """Return the contact list, skipping the download when it is unchanged since the last call."""
+    result = await client(GetContactsRequest(hash=_contacts_cache["hash"]))
+    _contacts_cache["expires_at"] = time.monotonic() + CONTACTS_CACHE_TTL
+    if isinstance(result, ContactsNotModified):
+        return _contacts_cache["users"]
+    users = result.users or []
+    _contacts_cache["users"] = users
+    _contacts_cache["hash"] = _contacts_hash(
+        result.saved_count, (c.user_id for c in result.contacts or [])
+    )
+    return users
+
+
+def _invalidate_blocked() -> None:
+    """Forget the cached blocked-user list after blocking or unblocking someone."""
+    _blocked_cache["expires_at"] = 0.0
+
+
+async def _get_blocked_users() -> list:
+    """Return every blocked user, fetched in BLOCKED_PAGE_SIZE pages and reused for BLOCKED_CACHE_TTL seconds."""
+    if _blocked_cache["expires_at"] > time.monotonic():
+        return _blocked_cache["users"]
+
+    users = []
+    offset = 0
+    while True:
+        result = await client(GetBlockedRequest(offset=offset, limit=BLOCKED_PAGE_SIZE))
+        users.extend(result.users or [])
+        offset += len(result.blocked)
+        # contacts.Blocked holds the full list; only contacts.BlockedSlice needs another page
+        if not isinstance(result, BlockedSlice) or not result.blocked or offset >= result.count:
+            break
+
+    _blocked_cache["users"] = users
+    _blocked_cache["expires_at"] = time.monotonic() + BLOCKED_CACHE_TTL
+    return users
+
 
 async def telegram_list_contacts(limit: int = 10, offset: int = 0) -> dict:
     """Contacts: List contacts as compact JSON with pagination (limit≤200)."""
@@ -30,8 +118,7 @@ async def telegram_list_contacts(limit: int = 10, offset: int = 0) -> dict:
         safe_limit = max(0, min(int(limit), 200)) or 10
         safe_offset = max(0, int(offset))
 
-        result = await client(functions.contacts.GetContactsRequest(hash=0))
-        users = result.users or []
+        users = await _get_contacts()
 
         sliced = users[safe_offset : safe_offset + safe_limit]
         return {
@@ -55,7 +142,7 @@ async def telegram_search_contacts(query: str, limit: int = 10, offset: int = 0)
 
         # Telethon's search has limit but no offset; fetch up to offset+limit then slice
         fetch_count = min(200, safe_offset + safe_limit) or 10
-        result = await client(functions.contacts.SearchRequest(q=query, limit=fetch_count))
+        result = await client(SearchRequest(q=query, limit=fetch_count))
         users = result.users or []
         sliced = users[safe_offset : safe_offset + safe_limit]
         return {
@@ -74,8 +161,12 @@ async def telegram_search_contacts(query: str, limit: int = 10, offset: int = 0)
 async def telegram_get_contact_ids() -> dict:
     """Contacts: Deprecated. Use list_contacts and read id fields."""
     try:
-        result = await client(functions.contacts.GetContactIDsRequest(hash=0))
-        ids = list(result or [])
+        # Recently fetched contacts are served from memory; add/delete/import invalidate them
+        if _contacts_cache["expires_at"] > time.monotonic():
+            users = _contacts_cache["users"]
+        else:
+            users = await _get_contacts()
+        ids = [u.id for u in users]
         return {"ok": True, "ids": ids}
     except Exception as e:
         return {"ok": False, "error": log_and_format_error("telegram_get_contact_ids", e)}
@@ -86,6 +177,10 @@ async def telegram_get_contact_ids() -> dict:
 async def telegram_get_last_interaction(user_id: int, limit: int = 5) -> dict:
     """Contacts: Get recent messages with a user as JSON (limit≤200)."""
     try:
+        # User ids are positive; negative ids are groups/channels, so skip the lookup
+        if int(user_id) <= 0:
+            return {"ok": False, "error": f"Error: ID {user_id} is not a user"}
+
         # Get contact info
         contact = await get_entity_with_fallback(client, user_id)
         if not isinstance(contact, User):
@@ -110,11 +205,8 @@ async def telegram_get_last_interaction(user_id: int, limit: int = 5) -> dict:
 async def telegram_add_contact(phone: str, first_name: str, last_name: str = "") -> dict:
     """Contacts: Add a contact by phone and name."""
     try:
-        # Try to import the required types first
-        from telethon.tl.types import InputPhoneContact
-
         result = await client(
-            functions.contacts.ImportContactsRequest(
+            ImportContactsRequest(
                 contacts=[
                     InputPhoneContact(
                         client_id=0, phone=phone, first_name=first_name, last_name=last_name
@@ -123,31 +215,10 @@ async def telegram_add_contact(phone: str, first_name: str, last_name: str = "")
             )
         )
         if result.imported:
+            _invalidate_contacts()
             return {"ok": True, "message": f"Contact {first_name} {last_name} added"}
         else:
             return {"ok": False, "error": "Error: Contact not added"}
-    except (ImportError, AttributeError) as type_err:
-        # Try alternative approach using raw API
-        try:
-            result = await client(
-                functions.contacts.ImportContactsRequest(
-                    contacts=[
-                        {
-                            "client_id": 0,
-                            "phone": phone,
-                            "first_name": first_name,
-                            "last_name": last_name,
-                        }
-                    ]
-                )
-            )
-            if hasattr(result, "imported") and result.imported:
-                return {"ok": True, "message": f"Contact {first_name} {last_name} added"}
-            else:
-                return {"ok": False, "error": "Error: Contact not added"}
-        except Exception as alt_e:
-            logger.exception(f"telegram_add_contact (alt method) failed (phone={phone})")
-            return {"ok": False, "error": log_and_format_error("telegram_add_contact", alt_e, phone=phone)}
     except Exception as e:
         logger.exception(f"telegram_add_contact failed (phone={phone})")
         return {"ok": False, "error": log_and_format_error("telegram_add_contact", e, phone=phone)}
@@ -158,8 +229,9 @@ async def telegram_add_contact(phone: str, first_name: str, last_name: str = "")
 async def telegram_delete_contact(user_id: int) -> dict:
     """Contacts: Delete a contact by user_id."""
     try:
-        user = await get_entity_with_fallback(client, user_id)
-        await client(functions.contacts.DeleteContactsRequest(id=[user]))
+        user = await get_input_entity_with_fallback(client, user_id)
+        await client(DeleteContactsRequest(id=[user]))
+        _invalidate_contacts()
         return {"ok": True, "message": f"Deleted contact {user_id}"}
     except Exception as e:
         return {"ok": False, "error": log_and_format_error("telegram_delete_contact", e, user_id=user_id)}
@@ -170,8 +242,9 @@ async def telegram_delete_contact(user_id: int) -> dict:
 async def telegram_block_user(user_id: int) -> dict:
     """Contacts: Block a user by user_id."""
     try:
-        user = await get_entity_with_fallback(client, user_id)
-        await client(functions.contacts.BlockRequest(id=user))
+        user = await get_input_entity_with_fallback(client, user_id)
+        await client(BlockRequest(id=user))
+        _invalidate_blocked()
         return {"ok": True, "message": f"Blocked user {user_id}"}
     except Exception as e:
         return {"ok": False, "error": log_and_format_error("telegram_block_user", e, user_id=user_id)}
@@ -179,11 +252,33 @@ async def telegram_block_user(user_id: int) -> dict:
 
 
 
+async def telegram_block_users(user_ids: list[int]) -> dict:
+    """Contacts: Block several users concurrently; returns blocked ids and per-user errors."""
+    try:
+        async def block(user_id):
+            user = await get_input_entity_with_fallback(client, user_id)
+            await client(BlockRequest(id=user))
+
+        blocked, failed = await run_batch(block, user_ids)
+        if blocked:
+            _invalidate_blocked()
+        errors = [
+            {"id": user_id, "error": log_and_format_error("telegram_block_users", err, user_id=user_id)}
+            for user_id, err in failed
+        ]
+        return {"ok": not errors, "blocked": blocked, "errors": errors}
+    except Exception as e:
+        return {"ok": False, "error": log_and_format_error("telegram_block_users", e, user_ids=user_ids)}
+
+
+
+
 async def telegram_unblock_user(user_id: int) -> dict:
     """Contacts: Unblock a user by user_id."""
     try:
-        user = await get_entity_with_fallback(client, user_id)
-        await client(functions.contacts.UnblockRequest(id=user))
+        user = await get_input_entity_with_fallback(client, user_id)
+        await client(UnblockRequest(id=user))
+        _invalidate_blocked()
         return {"ok": True, "message": f"Unblocked user {user_id}"}
     except Exception as e:
         return {"ok": False, "error": log_and_format_error("telegram_unblock_user", e, user_id=user_id)}
@@ -195,7 +290,7 @@ async def telegram_import_contacts(contacts: list) -> dict:
     """Contacts: Import contacts from a list of {phone, first_name, last_name}."""
     try:
         input_contacts = [
-            functions.contacts.InputPhoneContact(
+            InputPhoneContact(
                 client_id=i,
                 phone=c["phone"],
                 first_name=c["first_name"],
@@ -203,8 +298,14 @@ async def telegram_import_contacts(contacts: list) -> dict:
             )
             for i, c in enumerate(contacts)
         ]
-        result = await client(functions.contacts.ImportContactsRequest(contacts=input_contacts))
-        count = len(getattr(result, "imported", []) or [])
+        requests = [
+            ImportContactsRequest(contacts=input_contacts[i : i + IMPORT_CONTACTS_BATCH_SIZE])
+            for i in range(0, len(input_contacts), IMPORT_CONTACTS_BATCH_SIZE)
+        ]
+        # Send every batch in one container; ordered=True chains them with invokeAfterMsg
+        results = await client(requests, ordered=True) if requests else []
+        _invalidate_contacts()
+        count = sum(len(getattr(result, "imported", []) or []) for result in results)
         return {"ok": True, "message": f"Imported {count} contacts"}
     except Exception as e:
         return {"ok": False, "error": log_and_format_error("telegram_import_contacts", e, contacts=contacts)}
@@ -217,8 +318,7 @@ async def telegram_export_contacts(limit: int = 50, offset: int = 0) -> dict:
     try:
         safe_limit = max(0, min(int(limit), 200)) or 50
         safe_offset = max(0, int(offset))
-        result = await client(functions.contacts.GetContactsRequest(hash=0))
-        users = result.users or []
+        users = await _get_contacts()
         sliced = users[safe_offset : safe_offset + safe_limit]
         return {
             "ok": True,
@@ -238,15 +338,14 @@ async def telegram_get_blocked_users(limit: int = 10, offset: int = 0) -> dict:
     try:
         safe_limit = max(0, min(int(limit), 200)) or 10
         safe_offset = max(0, int(offset))
-        result = await client(functions.contacts.GetBlockedRequest(offset=safe_offset, limit=safe_limit))
-        users = getattr(result, "users", []) or []
-        total = getattr(result, "count", None)
+        users = await _get_blocked_users()
+        sliced = users[safe_offset : safe_offset + safe_limit]
         return {
             "ok": True,
-            "total": total if isinstance(total, int) else None,
+            "total": len(users),
             "limit": safe_limit,
             "offset": safe_offset,
-            "users": [format_entity(u) for u in users],
+            "users": [format_entity(u) for u in sliced],
         }
     except Exception as e:
         return {"ok": False, "error": log_and_format_error("telegram_get_blocked_users", e)}
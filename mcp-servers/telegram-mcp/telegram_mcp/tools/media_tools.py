@@ -4,17 +4,27 @@ Media: Send files/voice, download media, attachments, simple GIF/sticker helpers
 
 from mcp.server.fastmcp import FastMCP
 from telethon import TelegramClient, functions, utils
-from telethon.tl.types import *
+from telethon.tl.types import (
+    DocumentAttributeFilename,
+    InputMessagesFilterGif,
+    MessageMediaDocument,
+    MessageMediaPhoto,
+)
+from telethon.tl.types.messages import AllStickersNotModified
 import telethon.errors.rpcerrorlist
 import logging
 import json
 import os
-import mimetypes
+import asyncio
+import mmap
+import secrets
+import stat
+import time
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Union, Any
 
 # Import shared utilities
-from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, get_entity_with_fallback
+from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, json_dumps, get_input_entity_with_fallback, run_batch
 from ..utils.errors import log_and_format_error, ErrorCategory
 from ..utils.media_storage import MediaStorage
 
@@ -27,17 +37,256 @@ logger = logging.getLogger("telegram_mcp")
 # Initialize media storage
 media_storage = MediaStorage()
 
+# Reply for media that has no file to fetch (webpage previews, locations, polls, ...)
+NO_DOWNLOADABLE_MEDIA = "No downloadable media in the specified message."
+
+# Documents at least this large are fetched as DOWNLOAD_STREAMS interleaved part streams
+PARALLEL_DOWNLOAD_MIN_SIZE = 10 * 1024 * 1024
+DOWNLOAD_STREAMS = 4
+DOWNLOAD_PART_SIZE = 512 * 1024
+# ...and at least this large, written through a shared mapping instead of a pwrite per part
+MMAP_DOWNLOAD_MIN_SIZE = 32 * 1024 * 1024
+
+# Files fetched at once by download_media_batch. Each may run DOWNLOAD_STREAMS part streams,
+# so at most this many * DOWNLOAD_STREAMS * DOWNLOAD_PART_SIZE bytes are in flight
+DOWNLOAD_BATCH_CONCURRENCY = 3
+
+# Uploads in flight at once for send_files; kept low since uploads share one flood limit
+SEND_FILES_CONCURRENCY = 4
+
+# Non-image files at least this large are uploaded in maximum-size parts (Telethon
+# defaults to 128 KiB parts below 100 MiB)
+LARGE_UPLOAD_MIN_SIZE = 10 * 1024 * 1024
+UPLOAD_PART_SIZE_KB = 512
+
+# Installed sticker set titles are reused for STICKER_SETS_CACHE_TTL seconds, then revalidated by hash
+STICKER_SETS_CACHE_TTL = 300.0
+_sticker_sets_cache: Dict[str, Any] = {"hash": 0, "titles": None, "expires_at": 0.0}
+
+# Preferred extensions for common MIME types; others fall back to mimetypes.guess_extension
+_EXT_MAP = {
+    'image/jpeg': '.jpg',
+    'image/png': '.png',
+    'image/gif': '.gif',
+    'image/webp': '.webp',
+    'video/mp4': '.mp4',
+    'video/avi': '.avi',
+    'video/mov': '.mov',
+    'audio/mpeg': '.mp3',
+    'audio/ogg': '.ogg',
+    'application/pdf': '.pdf',
+    'text/plain': '.txt',
+}
+
+
+def _open_for_send(file_path: str, label: str = "File") -> tuple:
+    """Open a file for upload; returns (handle, None) or (None, error message) in one syscall."""
+    try:
+        # Unbuffered: upload parts are read whole, so a BufferedReader would only add a copy
+        return open(file_path, "rb", buffering=0), None
+    except (FileNotFoundError, IsADirectoryError, NotADirectoryError):
+        return None, f"{label} not found: {file_path}"
+    except PermissionError:
+        return None, f"{label} is not readable: {file_path}"
+
+
+def _regular_file_size(path: str) -> Optional[int]:
+    """Size of `path` if it is a regular file, else None."""
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return st.st_size if stat.S_ISREG(st.st_mode) else None
+
+
+def _discard(path: str) -> None:
+    """Remove a partially written file, if it exists."""
+    try:
+        os.unlink(path)
+    except FileNotFoundError:
+        pass
+
+
+async def _send_local_file(entity, file_path: str, **kwargs) -> Optional[str]:
+    """Upload a local file to `entity`; returns an error message instead if it can't be opened."""
+    fh, error = await asyncio.to_thread(_open_for_send, file_path)
+    if error:
+        return error
+    with fh:
+        size = os.fstat(fh.fileno()).st_size
+        if size >= LARGE_UPLOAD_MIN_SIZE and not utils.is_image(file_path):
+            uploaded = await client.upload_file(
+                fh,
+                part_size_kb=UPLOAD_PART_SIZE_KB,
+                file_size=size,
+                file_name=os.path.basename(file_path),
+            )
+            # send_file can't inspect an InputFile, so read the video/audio metadata from the path here.
+            # The MIME type is still guessed from file_name.
+            attributes, _ = await asyncio.to_thread(utils.get_attributes, file_path)
+            await client.send_file(entity, uploaded, attributes=attributes, **kwargs)
+        else:
+            await client.send_file(entity, fh, file_size=size, **kwargs)
+    return None
+
+
+def _describe_photo(media) -> tuple:
+    """(mime_type, extension, size) of a photo; its size depends on the thumbnail downloaded."""
+    return "image/jpeg", ".jpg", None
+
+
+def _document_file_name(doc) -> Optional[str]:
+    """Original file name of a document, if it was sent with one."""
+    return next(
+        (attr.file_name for attr in doc.attributes if isinstance(attr, DocumentAttributeFilename)),
+        None,
+    )
+
+
+def _media_info(media) -> Dict[str, Any]:
+    """Media type plus, for documents, file name, MIME type and size; the get_media_info payload."""
+    info = {"type": type(media).__name__}
+    doc = getattr(media, "document", None)
+    if doc:
+        file_name = _document_file_name(doc)
+        if file_name:
+            info["file_name"] = file_name
+        info["mime_type"] = getattr(doc, "mime_type", None)
+        info["size"] = getattr(doc, "size", None)
+    return info
+
+
+def _describe_document(media) -> tuple:
+    """(mime_type, extension, size) of a document, taking the extension from its file name when it has one."""
+    doc = media.document
+    mime_type = doc.mime_type or "application/octet-stream"
+    file_name = _document_file_name(doc)
+    extension = os.path.splitext(file_name)[1] if file_name else None
+    if not extension:
+        extension = _EXT_MAP.get(mime_type)
+        if not extension:
+            import mimetypes
+            extension = mimetypes.guess_extension(mime_type) or '.bin'
+    return mime_type, extension, doc.size
+
+
+def _describe_other_media(media) -> tuple:
+    """Nothing is known up front for other media; storage falls back to .bin and the on-disk size."""
+    return None, None, None
+
+
+# Media type -> describer returning (mime_type, extension, size) for storage
+_MEDIA_DESCRIBERS = {
+    MessageMediaPhoto: _describe_photo,
+    MessageMediaDocument: _describe_document,
+}
+
+
+def _open_download_target(path: str, size: int):
+    """Create `path` preallocated to `size` bytes; returns (fd, mmap or None) for _download_to_path."""
+    fd = os.open(path, os.O_RDWR | os.O_CREAT | os.O_TRUNC, 0o644)
+    try:
+        # Reserve the whole file up front so out-of-order parts don't fragment it
+        try:
+            os.posix_fallocate(fd, 0, size)
+        except (AttributeError, OSError):
+            os.ftruncate(fd, size)
+
+        if size < MMAP_DOWNLOAD_MIN_SIZE:
+            return fd, None
+        # Parts become plain memory copies into the page cache; the kernel schedules writeback
+        mapped = mmap.mmap(fd, size)
+        if hasattr(mmap, "MADV_SEQUENTIAL"):
+            mapped.madvise(mmap.MADV_SEQUENTIAL)
+        return fd, mapped
+    except BaseException:
+        os.close(fd)
+        raise
+
+
+async def _download_to_path(msg, path: str) -> bool:
+    """Download a message's media to `path`, using parallel part streams for large documents; False if there was nothing to download."""
+    document = getattr(msg.media, "document", None)
+    size = getattr(document, "size", None) or 0
+    if size < PARALLEL_DOWNLOAD_MIN_SIZE or not hasattr(os, "pwrite"):
+        # Webpage, geo, poll and similar media have no file, so nothing is written
+        return await client.download_media(msg, file=path) is not None
+
+    stride = DOWNLOAD_STREAMS * DOWNLOAD_PART_SIZE
+    # Creating and reserving the file can write out `size` bytes, so keep it off the event loop
+    fd, mapped = await asyncio.to_thread(_open_download_target, path, size)
+    tasks = []
+    try:
+        async def stream(first_part: int) -> None:
+            # Stream k fetches parts k, k + N, k + 2N, ... and writes each at its own offset
+            offset = first_part * DOWNLOAD_PART_SIZE
+            limit = (size - offset + stride - 1) // stride
+            async for chunk in client.iter_download(
+                document,
+                offset=offset,
+                stride=stride,
+                limit=limit,
+                request_size=DOWNLOAD_PART_SIZE,
+                file_size=size,
+            ):
+                if mapped is not None:
+                    mapped[offset:offset + len(chunk)] = chunk
+                else:
+                    os.pwrite(fd, chunk, offset)
+                offset += stride
+
+        tasks = [asyncio.ensure_future(stream(k)) for k in range(DOWNLOAD_STREAMS)]
+        await asyncio.gather(*tasks)
+        return True
+    finally:
+        # If one stream failed, stop the others and wait for them to exit before their file goes away
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        if mapped is not None:
+            mapped.close()
+        os.close(fd)
+
+
+async def _store_media(chat_id: int, message_id: int, msg) -> Optional[Dict[str, Any]]:
+    """Download a message's media into persistent storage and index it; returns the download_media payload, or None if the media has no file."""
+    describe = _MEDIA_DESCRIBERS.get(type(msg.media), _describe_other_media)
+    mime_type, extension, size = describe(msg.media)
+    
+    # Download straight into persistent storage. The .part name keeps a failed or
+    # interrupted download from replacing a previously stored copy, and is unique per
+    # call so concurrent downloads of the same message never write the same file.
+    saved_path = media_storage.allocate_path(chat_id, message_id, extension)
+    part_path = f"{saved_path}.{os.getpid()}.{secrets.token_hex(4)}.part"
+    try:
+        if not await _download_to_path(msg, part_path):
+            return None
+        await asyncio.to_thread(os.replace, part_path, saved_path)
+    except BaseException:
+        await asyncio.to_thread(_discard, part_path)
+        raise
+    
+    entry = media_storage.register_media(
+        chat_id, message_id, saved_path, mime_type, size, media_info=_media_info(msg.media)
+    )
+    return {
+        "ok": True,
+        "mime_type": mime_type,
+        "file": os.path.basename(saved_path),
+        "size": entry["size"],
+        "path": saved_path,
+        "resource_uri": f"tgfile://{chat_id}/{message_id}",
+    }
+
 
 async def telegram_send_file(chat_id: int, file_path: str, caption: str = None) -> str:
     """Send a local file to a chat; returns ok/message."""
     try:
-        if not os.path.isfile(file_path):
-            return f"File not found: {file_path}"
-        if not os.access(file_path, os.R_OK):
-            return f"File is not readable: {file_path}"
-        entity = await get_entity_with_fallback(client, chat_id)
-        await client.send_file(entity, file_path, caption=caption)
-        return json.dumps({"ok": True, "message": "File sent", "id": chat_id})
+        entity = await get_input_entity_with_fallback(client, chat_id)
+        error = await _send_local_file(entity, file_path, caption=caption)
+        if error:
+            return error
+        return json_dumps({"ok": True, "message": "File sent", "id": chat_id})
     except Exception as e:
         return log_and_format_error(
             "send_file", e, chat_id=chat_id, file_path=file_path, caption=caption
@@ -46,16 +295,37 @@ async def telegram_send_file(chat_id: int, file_path: str, caption: str = None)
 
 
 
+async def telegram_send_files(chat_id: int, file_paths: list[str], captions: list[str] = None) -> str:
+    """Send several local files to a chat concurrently (arrival order may differ); captions[i] goes with file_paths[i]. Returns sent paths and per-file errors."""
+    try:
+        entity = await get_input_entity_with_fallback(client, chat_id)
+        captions = captions or []
+        failures = {}
+
+        async def send(index):
+            caption = captions[index] if index < len(captions) else None
+            error = await _send_local_file(entity, file_paths[index], caption=caption)
+            if error:
+                failures[index] = error
+
+        done, failed = await run_batch(send, range(len(file_paths)), SEND_FILES_CONCURRENCY)
+        for index, err in failed:
+            failures[index] = log_and_format_error(
+                "telegram_send_files", err, chat_id=chat_id, file_path=file_paths[index]
+            )
+        sent = [file_paths[index] for index in done if index not in failures]
+        errors = [{"path": file_paths[index], "error": failures[index]} for index in sorted(failures)]
+        return json_dumps({"ok": not errors, "sent": sent, "errors": errors})
+    except Exception as e:
+        return log_and_format_error("telegram_send_files", e, chat_id=chat_id, file_paths=file_paths)
+
+
+
+
 async def telegram_download_media(chat_id: int, message_id: int, file_path: str = None) -> str:
     """Download message media / attachments; returns JSON with mime_type, size, path, resource_uri. path can be used to OCR images"""
     try:
-        # Ensure client is connected and authenticated
-        if not client.is_connected():
-            await client.connect()
-        if not await client.is_user_authorized():
-            raise ValueError("Telegram client is not authorized. Please run the session generator first.")
-        
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         msg = await client.get_messages(entity, ids=message_id)
         if not msg or not msg.media:
             return "No media found in the specified message."
@@ -64,84 +334,26 @@ async def telegram_download_media(chat_id: int, message_id: int, file_path: str
         if file_path:
             # Check if directory is writable
             dir_path = os.path.dirname(file_path) or "."
-            if not os.access(dir_path, os.W_OK):
+            if not await asyncio.to_thread(os.access, dir_path, os.W_OK):
                 return f"Directory not writable: {dir_path}"
             await client.download_media(msg, file=file_path)
-            if not os.path.isfile(file_path):
+            file_size = await asyncio.to_thread(_regular_file_size, file_path)
+            if file_size is None:
                 return f"Download failed: file not created at {file_path}"
             # Return JSON payload for specified file_path
-            file_size = os.path.getsize(file_path)
-            return json.dumps({
+            return json_dumps({
                 "ok": True,
                 "path": file_path,
                 "size": file_size,
                 "mime_type": None,
                 "resource_uri": f"tgfile://{chat_id}/{message_id}",
-            }, indent=2)
+            })
         
         # New behavior: save to persistent storage and return resource URI
-        # Extract MIME type and extension from Telegram media object
-        mime_type = None
-        extension = None
-        
-        if hasattr(msg.media, 'photo'):
-            mime_type = "image/jpeg"
-            extension = ".jpg"
-        elif hasattr(msg.media, 'document'):
-            doc = msg.media.document
-            mime_type = doc.mime_type or "application/octet-stream"
-            # Get extension from filename or MIME type
-            if doc.attributes:
-                for attr in doc.attributes:
-                    if hasattr(attr, 'file_name') and attr.file_name:
-                        extension = os.path.splitext(attr.file_name)[1]
-                        break
-            
-            # If no filename found, try to get extension from MIME type
-            if not extension:
-                ext_map = {
-                    'image/jpeg': '.jpg',
-                    'image/png': '.png',
-                    'image/gif': '.gif',
-                    'image/webp': '.webp',
-                    'video/mp4': '.mp4',
-                    'video/avi': '.avi',
-                    'video/mov': '.mov',
-                    'audio/mpeg': '.mp3',
-                    'audio/ogg': '.ogg',
-                    'application/pdf': '.pdf',
-                    'text/plain': '.txt',
-                }
-                extension = ext_map.get(mime_type, '.bin')
-        
-        # Create temporary file for download with proper extension
-        import tempfile
-        suffix = extension or '.bin'
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as temp_file:
-            temp_path = temp_file.name
-        
-        try:
-            # Download media to temporary file
-            await client.download_media(msg, file=temp_path)
-            
-            # Save to persistent storage with proper MIME type
-            saved_path = media_storage.save_media(chat_id, message_id, temp_path, mime_type)
-            
-            file_size = os.path.getsize(saved_path)
-            payload = {
-                "ok": True,
-                "mime_type": mime_type,
-                "file": os.path.basename(saved_path),
-                "size": file_size,
-                "path": saved_path,
-                "resource_uri": f"tgfile://{chat_id}/{message_id}",
-            }
-            return json.dumps(payload, indent=2, default=json_serializer)
-            
-        finally:
-            # Clean up temporary file
-            if os.path.exists(temp_path):
-                os.unlink(temp_path)
+        payload = await _store_media(chat_id, message_id, msg)
+        if payload is None:
+            return NO_DOWNLOADABLE_MEDIA
+        return json_dumps(payload)
                 
     except Exception as e:
         return log_and_format_error(
@@ -151,26 +363,58 @@ async def telegram_download_media(chat_id: int, message_id: int, file_path: str
 
 
 
+async def telegram_download_media_batch(chat_id: int, message_ids: list[int]) -> str:
+    """Download the media of several messages of a chat into storage concurrently; returns per-message results (as download_media) and errors."""
+    try:
+        entity = await get_input_entity_with_fallback(client, chat_id)
+        message_ids = list(dict.fromkeys(message_ids))
+        messages = dict(zip(message_ids, await client.get_messages(entity, ids=message_ids)))
+        stored = {}
+        failures = {}
+
+        async def download(message_id):
+            msg = messages[message_id]
+            if not msg or not msg.media:
+                failures[message_id] = "No media found in the specified message."
+                return
+            payload = await _store_media(chat_id, message_id, msg)
+            if payload is None:
+                failures[message_id] = NO_DOWNLOADABLE_MEDIA
+                return
+            stored[message_id] = payload
+
+        _, failed = await run_batch(download, message_ids, DOWNLOAD_BATCH_CONCURRENCY)
+        for message_id, err in failed:
+            failures[message_id] = log_and_format_error(
+                "telegram_download_media_batch", err, chat_id=chat_id, message_id=message_id
+            )
+        items = [stored[message_id] for message_id in message_ids if message_id in stored]
+        errors = [
+            {"message_id": message_id, "error": failures[message_id]}
+            for message_id in message_ids
+            if message_id in failures
+        ]
+        return json_dumps({"ok": not errors, "items": items, "errors": errors})
+    except Exception as e:
+        return log_and_format_error(
+            "telegram_download_media_batch", e, chat_id=chat_id, message_ids=message_ids
+        )
+
+
+
+
 async def telegram_send_voice(chat_id: int, file_path: str) -> str:
     """Send a .ogg/.opus voice note; returns ok/message."""
     try:
-        if not os.path.isfile(file_path):
-            return f"File not found: {file_path}"
-        if not os.access(file_path, os.R_OK):
-            return f"File is not readable: {file_path}"
-        mime, _ = mimetypes.guess_type(file_path)
-        if not (
-            mime
-            and (
-                mime == "audio/ogg"
-                or file_path.lower().endswith(".ogg")
-                or file_path.lower().endswith(".opus")
-            )
-        ):
-            return "Voice file must be .ogg or .opus format."
-        entity = await get_entity_with_fallback(client, chat_id)
-        await client.send_file(entity, file_path, voice_note=True)
-        return json.dumps({"ok": True, "message": "Voice message sent", "id": chat_id})
+        fh, error = await asyncio.to_thread(_open_for_send, file_path)
+        if error:
+            return error
+        with fh:
+            if not file_path.lower().endswith((".ogg", ".opus")):
+                return "Voice file must be .ogg or .opus format."
+            entity = await get_input_entity_with_fallback(client, chat_id)
+            await client.send_file(entity, fh, voice_note=True)
+        return json_dumps({"ok": True, "message": "Voice message sent", "id": chat_id})
     except Exception as e:
         return log_and_format_error("telegram_send_voice", e, chat_id=chat_id, file_path=file_path)
 
@@ -180,24 +424,15 @@ async def telegram_send_voice(chat_id: int, file_path: str) -> str:
 async def telegram_get_media_info(chat_id: int, message_id: int) -> str:
     """Get basic media info for a message; returns JSON."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        # Media downloaded into storage already has its description in the index
+        stored = media_storage.get_media(chat_id, message_id)
+        if stored and "media_info" in stored:
+            return json_dumps(stored["media_info"])
+        entity = await get_input_entity_with_fallback(client, chat_id)
         msg = await client.get_messages(entity, ids=message_id)
         if not msg or not msg.media:
-            return json.dumps({"media": None}, indent=2)
-        info = {
-            "type": type(msg.media).__name__,
-        }
-        # Attempt to include filename for documents
-        if hasattr(msg.media, 'document') and getattr(msg.media, 'document', None):
-            doc = msg.media.document
-            if getattr(doc, 'attributes', None):
-                for attr in doc.attributes:
-                    if hasattr(attr, 'file_name') and attr.file_name:
-                        info['file_name'] = attr.file_name
-                        break
-            info['mime_type'] = getattr(doc, 'mime_type', None)
-            info['size'] = getattr(doc, 'size', None)
-        return json.dumps(info, indent=2, default=json_serializer)
+            return json_dumps({"media": None})
+        return json_dumps(_media_info(msg.media))
     except Exception as e:
         return log_and_format_error("telegram_get_media_info", e, chat_id=chat_id, message_id=message_id)
 
@@ -207,8 +442,15 @@ async def telegram_get_media_info(chat_id: int, message_id: int) -> str:
 async def telegram_get_sticker_sets() -> str:
     """List available sticker sets (JSON titles)."""
     try:
-        result = await client(functions.messages.GetAllStickersRequest(hash=0))
-        return json.dumps([s.title for s in result.sets], indent=2)
+        if _sticker_sets_cache["expires_at"] <= time.monotonic():
+            result = await client(
+                functions.messages.GetAllStickersRequest(hash=_sticker_sets_cache["hash"])
+            )
+            if not isinstance(result, AllStickersNotModified):
+                _sticker_sets_cache["hash"] = result.hash
+                _sticker_sets_cache["titles"] = [s.title for s in result.sets]
+            _sticker_sets_cache["expires_at"] = time.monotonic() + STICKER_SETS_CACHE_TTL
+        return json_dumps(_sticker_sets_cache["titles"])
     except Exception as e:
         return log_and_format_error("telegram_get_sticker_sets", e)
 
@@ -218,15 +460,15 @@ async def telegram_get_sticker_sets() -> str:
 async def telegram_send_sticker(chat_id: int, file_path: str) -> str:
     """Send a .webp sticker; returns ok/message."""
     try:
-        if not os.path.isfile(file_path):
-            return f"Sticker file not found: {file_path}"
-        if not os.access(file_path, os.R_OK):
-            return f"Sticker file is not readable: {file_path}"
-        if not file_path.lower().endswith(".webp"):
-            return "Sticker file must be a .webp file."
-        entity = await get_entity_with_fallback(client, chat_id)
-        await client.send_file(entity, file_path, force_document=False)
-        return json.dumps({"ok": True, "message": "Sticker sent", "id": chat_id})
+        fh, error = await asyncio.to_thread(_open_for_send, file_path, "Sticker file")
+        if error:
+            return error
+        with fh:
+            if not file_path.lower().endswith(".webp"):
+                return "Sticker file must be a .webp file."
+            entity = await get_input_entity_with_fallback(client, chat_id)
+            await client.send_file(entity, fh, force_document=False)
+        return json_dumps({"ok": True, "message": "Sticker sent", "id": chat_id})
     except Exception as e:
         return log_and_format_error("telegram_send_sticker", e, chat_id=chat_id, file_path=file_path)
 
@@ -243,14 +485,10 @@ async def telegram_get_gif_search(query: str, limit: int = 10) -> str:
             )
             if not result.gifs:
                 return "[]"
-            return json.dumps(
-                [g.document.id for g in result.gifs], indent=2, default=json_serializer
-            )
+            return json_dumps([g.document.id for g in result.gifs])
         except (AttributeError, ImportError):
             # Fallback approach: Use SearchRequest with GIF filter
             try:
-                from telethon.tl.types import InputMessagesFilterGif
-
                 result = await client(
                     functions.messages.SearchRequest(
                         peer="gif",
@@ -269,11 +507,11 @@ async def telegram_get_gif_search(query: str, limit: int = 10) -> str:
                 if not result or not hasattr(result, "messages") or not result.messages:
                     return "[]"
                 # Extract document IDs from any messages with media
-                gif_ids = []
-                for msg in result.messages:
-                    if hasattr(msg, "media") and msg.media and hasattr(msg.media, "document"):
-                        gif_ids.append(msg.media.document.id)
-                return json.dumps(gif_ids, default=json_serializer)
+                return json_dumps([
+                    msg.media.document.id
+                    for msg in result.messages
+                    if getattr(getattr(msg, "media", None), "document", None)
+                ])
             except Exception as inner_e:
                 # Last resort: Try to fetch from a public bot
                 return f"Could not search GIFs using available methods: {inner_e}"
@@ -289,9 +527,9 @@ async def telegram_send_gif(chat_id: int, gif_id: int) -> str:
     try:
         if not isinstance(gif_id, int):
             return "gif_id must be a Telegram document ID (integer), not a file path. Use get_gif_search to find IDs."
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         await client.send_file(entity, gif_id)
-        return json.dumps({"ok": True, "message": "GIF sent", "id": chat_id})
+        return json_dumps({"ok": True, "message": "GIF sent", "id": chat_id})
     except Exception as e:
         return log_and_format_error("telegram_send_gif", e, chat_id=chat_id, gif_id=gif_id)
 
@@ -299,24 +537,9 @@ async def telegram_send_gif(chat_id: int, gif_id: int) -> str:
 async def telegram_list_downloaded_media() -> str:
     """List downloaded media files in persistent storage as JSON."""
     try:
-        media_list = media_storage.list_media()
-        if not media_list:
-            return json.dumps({"items": [], "stats": media_storage.get_storage_stats()}, indent=2)
-
-        items = []
-        for media in media_list:
-            items.append({
-                "chat_id": media['chat_id'],
-                "message_id": media['message_id'],
-                "file": os.path.basename(media['path']),
-                "mime_type": media['mime_type'],
-                "size": media['size'],
-                "path": media['path'],
-                "timestamp": media['timestamp'],
-            })
-
-        stats = media_storage.get_storage_stats()
-        return json.dumps({"items": items, "stats": stats}, indent=2)
+        items = media_storage.list_media_public()
+        stats = media_storage.get_storage_stats(items)
+        return json_dumps({"items": items, "stats": stats})
         
     except Exception as e:
         return log_and_format_error("telegram_list_downloaded_media", e)
@@ -329,26 +552,19 @@ async def telegram_clear_downloaded_media(chat_id: int = None, message_id: int =
             # Clear specific media file
             success = media_storage.delete_media(chat_id, message_id)
             if success:
-                return json.dumps({"ok": True, "message": "Cleared media file", "chat_id": chat_id, "message_id": message_id})
+                return json_dumps({"ok": True, "message": "Cleared media file", "chat_id": chat_id, "message_id": message_id})
             else:
-                return json.dumps({"ok": False, "message": "No media file found", "chat_id": chat_id, "message_id": message_id})
+                return json_dumps({"ok": False, "message": "No media file found", "chat_id": chat_id, "message_id": message_id})
         
         elif chat_id is not None:
             # Clear all media from specific chat
-            media_list = media_storage.list_media()
-            cleared_count = 0
-            
-            for media in media_list:
-                if media['chat_id'] == chat_id:
-                    media_storage.delete_media(media['chat_id'], media['message_id'])
-                    cleared_count += 1
-
-            return json.dumps({"ok": True, "message": "Cleared chat media", "chat_id": chat_id, "count": cleared_count})
+            cleared_count = media_storage.delete_by_chat(chat_id)
+            return json_dumps({"ok": True, "message": "Cleared chat media", "chat_id": chat_id, "count": cleared_count})
         
         else:
             # Clear all media
             cleared_count = media_storage.clear_all_media()
-            return json.dumps({"ok": True, "message": "Cleared all media", "count": cleared_count})
+            return json_dumps({"ok": True, "message": "Cleared all media", "count": cleared_count})
             
     except Exception as e:
         return log_and_format_error("telegram_clear_downloaded_media", e, chat_id=chat_id, message_id=message_id)
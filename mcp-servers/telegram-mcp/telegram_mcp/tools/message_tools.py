@@ -6,35 +6,53 @@ Auto-generated from main.py refactoring
 from mcp.server.fastmcp import FastMCP
 from telethon import TelegramClient, functions, utils
 from telethon.tl.types import *
+from telethon.tl.types import InputMediaPoll, Poll, PollAnswer, TextWithEntities
 import telethon.errors.rpcerrorlist
-import logging
 import json
 import os
-from datetime import datetime, timedelta
+import asyncio
+import secrets
+from datetime import datetime, timedelta, timezone
 from typing import List, Dict, Optional, Union, Any
 
 # Import shared utilities
-from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, format_message_display, get_entity_with_fallback
+from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, json_dumps, format_message_display, get_input_entity_with_fallback
 from ..utils.errors import log_and_format_error, ErrorCategory
 
 # Import configuration
 from ..config import client, logger
 
-# Get logger
-logger = logging.getLogger("telegram_mcp")
+# Older Telethon versions lack the pinned-messages search filter
+try:
+    from telethon.tl.types import InputMessagesFilterPinned
+
+    _HAS_PINNED_FILTER = True
+except ImportError:
+    InputMessagesFilterPinned = None
+    _HAS_PINNED_FILTER = False
+
+_END_OF_DAY = timedelta(days=1, microseconds=-1)
+
+# Poll option identifiers, one per allowed option
+_OPT_BYTES = [bytes((i,)) for i in range(10)]
+
+
+def _parse_day(value: str) -> datetime:
+    """Parse a YYYY-MM-DD date as midnight UTC, comparable with Telegram's aware message dates."""
+    return datetime.strptime(value, "%Y-%m-%d").replace(tzinfo=timezone.utc)
 
 
 async def telegram_get_messages(chat_id: int, page: int = 1, page_size: int = 10) -> str:
     """Messages: List messages (paged) from a chat and return JSON."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         # enforce limits
         safe_page = max(1, int(page))
         safe_page_size = min(50, max(1, int(page_size)))
         offset = (safe_page - 1) * safe_page_size
         messages = await client.get_messages(entity, limit=safe_page_size, add_offset=offset)
         data = [format_message(m) for m in messages] if messages else []
-        return json.dumps(data, default=json_serializer)
+        return json_dumps(data)
     except Exception as e:
         return log_and_format_error(
             "get_messages", e, chat_id=chat_id, page=page, page_size=page_size
@@ -61,9 +79,9 @@ async def telegram_send_message(
         return log_and_format_error("telegram_send_message", ValueError("Missing required parameter: message or content"), chat_id=actual_chat_id)
     
     try:
-        entity = await get_entity_with_fallback(client, actual_chat_id)
+        entity = await get_input_entity_with_fallback(client, actual_chat_id)
         await client.send_message(entity, actual_message)
-        return json.dumps({"ok": True, "message": "Message sent."})
+        return json_dumps({"ok": True, "message": "Message sent."})
     except Exception as e:
         return log_and_format_error("telegram_send_message", e, chat_id=actual_chat_id)
 
@@ -79,7 +97,7 @@ async def telegram_list_messages(
 ) -> str:
     """Messages: List messages with filters and return JSON (limit<=50)."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
 
         # Parse date filters if provided
         from_date_obj = None
@@ -87,32 +105,14 @@ async def telegram_list_messages(
 
         if from_date:
             try:
-                from_date_obj = datetime.strptime(from_date, "%Y-%m-%d")
-                # Make it timezone aware by adding UTC timezone info
-                # Use datetime.timezone.utc for Python 3.9+ or import timezone directly for 3.13+
-                try:
-                    # For Python 3.9+
-                    from_date_obj = from_date_obj.replace(tzinfo=datetime.timezone.utc)
-                except AttributeError:
-                    # For Python 3.13+
-                    from datetime import timezone
-
-                    from_date_obj = from_date_obj.replace(tzinfo=timezone.utc)
+                from_date_obj = _parse_day(from_date)
             except ValueError:
                 return "Error: Invalid from_date format. Use YYYY-MM-DD."
 
         if to_date:
             try:
-                to_date_obj = datetime.strptime(to_date, "%Y-%m-%d")
-                # Set to end of day and make timezone aware
-                to_date_obj = to_date_obj + timedelta(days=1, microseconds=-1)
-                # Add timezone info
-                try:
-                    to_date_obj = to_date_obj.replace(tzinfo=datetime.timezone.utc)
-                except AttributeError:
-                    from datetime import timezone
-
-                    to_date_obj = to_date_obj.replace(tzinfo=timezone.utc)
+                # End of that day, so to_date is inclusive
+                to_date_obj = _parse_day(to_date) + _END_OF_DAY
             except ValueError:
                 return "Error: Invalid to_date format. Use YYYY-MM-DD."
 
@@ -125,21 +125,21 @@ async def telegram_list_messages(
             # IMPORTANT: Do not combine offset_date with search.
             # Use server-side search alone, then enforce date bounds client-side.
             params["search"] = search_query
-            messages = []
+            data = []
             async for msg in client.iter_messages(entity, **params):  # newest -> oldest
                 if to_date_obj and msg.date > to_date_obj:
                     continue
                 if from_date_obj and msg.date < from_date_obj:
                     break
-                messages.append(msg)
-                if len(messages) >= safe_limit:
+                data.append(format_message(msg))
+                if len(data) >= safe_limit:
                     break
 
         else:
             # Use server-side iteration when only date bounds are present
             # (no search) to avoid over-fetching.
             if from_date_obj or to_date_obj:
-                messages = []
+                data = []
                 if from_date_obj:
                     # Walk forward from start date (oldest -> newest)
                     async for msg in client.iter_messages(
@@ -149,8 +149,8 @@ async def telegram_list_messages(
                             break
                         if msg.date < from_date_obj:
                             continue
-                        messages.append(msg)
-                        if len(messages) >= safe_limit:
+                        data.append(format_message(msg))
+                        if len(data) >= safe_limit:
                             break
                 else:
                     # Only upper bound: walk backward from end bound
@@ -159,14 +159,14 @@ async def telegram_list_messages(
                         entity,
                         offset_date=to_date_obj + timedelta(microseconds=1),
                     ):
-                        messages.append(msg)
-                        if len(messages) >= safe_limit:
+                        data.append(format_message(msg))
+                        if len(data) >= safe_limit:
                             break
             else:
                 messages = await client.get_messages(entity, limit=safe_limit, **params)
+                data = [format_message(m) for m in messages]
 
-        data = [format_message(m) for m in messages] if messages else []
-        return json.dumps(data, default=json_serializer)
+        return json_dumps(data)
     except Exception as e:
         return log_and_format_error("telegram_list_messages", e, chat_id=chat_id)
 
@@ -176,31 +176,31 @@ async def telegram_list_messages(
 async def telegram_get_message_context(chat_id: int, message_id: int, context_size: int = 3) -> str:
     """Messages: Get message context around a message and return JSON."""
     try:
-        chat = await get_entity_with_fallback(client, chat_id)
-        # Get messages around the specified message
-        messages_before = await client.get_messages(chat, limit=context_size, max_id=message_id)
-        central_message = await client.get_messages(chat, ids=message_id)
-        # Fix: get_messages(ids=...) returns a single Message, not a list
-        if central_message is not None and not isinstance(central_message, list):
-            central_message = [central_message]
-        elif central_message is None:
-            central_message = []
-        messages_after = await client.get_messages(
-            chat, limit=context_size, min_id=message_id, reverse=True
+        chat = await get_input_entity_with_fallback(client, chat_id)
+        # One history slice around the message: a negative add_offset starts the page
+        # context_size + 1 messages above it, so it holds the message itself, the
+        # context_size newer ones and the context_size older ones (newest first).
+        # Ids aren't contiguous, so this can't be done with an id range.
+        window = await client.get_messages(
+            chat,
+            limit=2 * context_size + 1,
+            offset_id=message_id,
+            add_offset=-(context_size + 1),
         )
-        if not central_message:
+        central_message = next((m for m in window if m.id == message_id), None)
+        if central_message is None:
             return f"Message with ID {message_id} not found in chat {chat_id}."
-        # Combine messages in chronological order
-        all_messages = list(messages_before) + list(central_message) + list(messages_after)
-        all_messages.sort(key=lambda m: m.id)
+        # Near the newest message the page can't start above it and holds extra older ones
+        messages_before = [m for m in window if m.id < message_id][:context_size]
+        messages_after = [m for m in reversed(window) if m.id > message_id]
         data = {
             "chat_id": chat_id,
             "message_id": message_id,
             "before": [format_message(m) for m in messages_before],
-            "center": format_message(central_message[0]) if central_message else None,
+            "center": format_message(central_message),
             "after": [format_message(m) for m in messages_after],
         }
-        return json.dumps(data, default=json_serializer)
+        return json_dumps(data)
     except Exception as e:
         return log_and_format_error(
             "get_message_context",
@@ -216,10 +216,12 @@ async def telegram_get_message_context(chat_id: int, message_id: int, context_si
 async def telegram_forward_message(from_chat_id: int, message_id: int, to_chat_id: int) -> str:
     """Messages: Forward a message and return { ok, message }."""
     try:
-        from_entity = await get_entity_with_fallback(client, from_chat_id)
-        to_entity = await get_entity_with_fallback(client, to_chat_id)
+        from_entity, to_entity = await asyncio.gather(
+            get_input_entity_with_fallback(client, from_chat_id),
+            get_input_entity_with_fallback(client, to_chat_id),
+        )
         await client.forward_messages(to_entity, message_id, from_entity)
-        return json.dumps({"ok": True, "message": f"Message {message_id} forwarded."})
+        return json_dumps({"ok": True, "message": f"Message {message_id} forwarded."})
     except Exception as e:
         return log_and_format_error(
             "forward_message",
@@ -235,9 +237,9 @@ async def telegram_forward_message(from_chat_id: int, message_id: int, to_chat_i
 async def telegram_edit_message(chat_id: int, message_id: int, new_text: str) -> str:
     """Messages: Edit a message and return { ok, message }."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         await client.edit_message(entity, message_id, new_text)
-        return json.dumps({"ok": True, "message": f"Message {message_id} edited."})
+        return json_dumps({"ok": True, "message": f"Message {message_id} edited."})
     except Exception as e:
         return log_and_format_error(
             "edit_message", e, chat_id=chat_id, message_id=message_id, new_text=new_text
@@ -249,9 +251,9 @@ async def telegram_edit_message(chat_id: int, message_id: int, new_text: str) ->
 async def telegram_delete_message(chat_id: int, message_id: int) -> str:
     """Messages: Delete a message and return { ok, message }."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         await client.delete_messages(entity, message_id)
-        return json.dumps({"ok": True, "message": f"Message {message_id} deleted."})
+        return json_dumps({"ok": True, "message": f"Message {message_id} deleted."})
     except Exception as e:
         return log_and_format_error("telegram_delete_message", e, chat_id=chat_id, message_id=message_id)
 
@@ -261,9 +263,9 @@ async def telegram_delete_message(chat_id: int, message_id: int) -> str:
 async def telegram_pin_message(chat_id: int, message_id: int) -> str:
     """Messages: Pin a message and return { ok, message }."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         await client.pin_message(entity, message_id)
-        return json.dumps({"ok": True, "message": f"Message {message_id} pinned."})
+        return json_dumps({"ok": True, "message": f"Message {message_id} pinned."})
     except Exception as e:
         return log_and_format_error("telegram_pin_message", e, chat_id=chat_id, message_id=message_id)
 
@@ -273,9 +275,9 @@ async def telegram_pin_message(chat_id: int, message_id: int) -> str:
 async def telegram_unpin_message(chat_id: int, message_id: int) -> str:
     """Messages: Unpin a message and return { ok, message }."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         await client.unpin_message(entity, message_id)
-        return json.dumps({"ok": True, "message": f"Message {message_id} unpinned."})
+        return json_dumps({"ok": True, "message": f"Message {message_id} unpinned."})
     except Exception as e:
         return log_and_format_error("telegram_unpin_message", e, chat_id=chat_id, message_id=message_id)
 
@@ -285,9 +287,9 @@ async def telegram_unpin_message(chat_id: int, message_id: int) -> str:
 async def telegram_mark_as_read(chat_id: int) -> str:
     """Messages: Mark chat as read and return { ok, message }."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         await client.send_read_acknowledge(entity)
-        return json.dumps({"ok": True, "message": f"Marked as read."})
+        return json_dumps({"ok": True, "message": f"Marked as read."})
     except Exception as e:
         return log_and_format_error("telegram_mark_as_read", e, chat_id=chat_id)
 
@@ -297,9 +299,9 @@ async def telegram_mark_as_read(chat_id: int) -> str:
 async def telegram_reply_to_message(chat_id: int, message_id: int, text: str) -> str:
     """Messages: Reply to a message and return { ok, message }."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         await client.send_message(entity, text, reply_to=message_id)
-        return json.dumps({"ok": True, "message": f"Replied to message {message_id}."})
+        return json_dumps({"ok": True, "message": f"Replied to message {message_id}."})
     except Exception as e:
         return log_and_format_error(
             "reply_to_message", e, chat_id=chat_id, message_id=message_id, text=text
@@ -311,11 +313,11 @@ async def telegram_reply_to_message(chat_id: int, message_id: int, text: str) ->
 async def telegram_search_messages(chat_id: int, query: str, limit: int = 10) -> str:
     """Messages: Search messages by text and return JSON (limit<=50)."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         safe_limit = min(50, max(1, int(limit)))
         messages = await client.get_messages(entity, limit=safe_limit, search=query)
         data = [format_message(m) for m in messages] if messages else []
-        return json.dumps(data, default=json_serializer)
+        return json_dumps(data)
     except Exception as e:
         return log_and_format_error(
             "search_messages", e, chat_id=chat_id, query=query, limit=limit
@@ -339,21 +341,18 @@ async def telegram_get_history(chat_id: int, limit: int = 10) -> str:
 async def telegram_get_pinned_messages(chat_id: int) -> str:
     """Messages: List pinned messages and return JSON."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
         # Use correct filter based on Telethon version
-        try:
-            # Try newer Telethon approach
-            from telethon.tl.types import InputMessagesFilterPinned
-
+        if _HAS_PINNED_FILTER:
             messages = await client.get_messages(entity, filter=InputMessagesFilterPinned())
-        except (ImportError, AttributeError):
+        else:
             # Fallback - try without filter and manually filter pinned
             all_messages = await client.get_messages(entity, limit=50)
             messages = [m for m in all_messages if getattr(m, "pinned", False)]
         data = [format_message(m) for m in messages] if messages else []
-        return json.dumps(data, default=json_serializer)
+        return json_dumps(data)
     except Exception as e:
-        logger.exception(f"telegram_get_pinned_messages failed (chat_id={chat_id})")
+        logger.exception("telegram_get_pinned_messages failed (chat_id=%s)", chat_id)
         return log_and_format_error("telegram_get_pinned_messages", e, chat_id=chat_id)
 
 
@@ -370,7 +369,7 @@ async def telegram_create_poll(
 ) -> str:
     """Messages: Create a poll in a chat and return { ok, message }."""
     try:
-        entity = await get_entity_with_fallback(client, chat_id)
+        entity = await get_input_entity_with_fallback(client, chat_id)
 
         # Validate options
         if len(options) < 2:
@@ -387,14 +386,11 @@ async def telegram_create_poll(
                 return f"Invalid close_date format. Use YYYY-MM-DD HH:MM:SS format."
 
         # Create the poll using InputMediaPoll with SendMediaRequest
-        from telethon.tl.types import InputMediaPoll, Poll, PollAnswer, TextWithEntities
-        import random
-
         poll = Poll(
-            id=random.randint(0, 2**63 - 1),
+            id=secrets.randbits(63),
             question=TextWithEntities(text=question, entities=[]),
             answers=[
-                PollAnswer(text=TextWithEntities(text=option, entities=[]), option=bytes([i]))
+                PollAnswer(text=TextWithEntities(text=option, entities=[]), option=_OPT_BYTES[i])
                 for i, option in enumerate(options)
             ],
             multiple_choice=multiple_choice,
@@ -408,13 +404,13 @@ async def telegram_create_poll(
                 peer=entity,
                 media=InputMediaPoll(poll=poll),
                 message="",
-                random_id=random.randint(0, 2**63 - 1),
+                random_id=secrets.randbits(63),
             )
         )
 
-        return json.dumps({"ok": True, "message": "Poll created."})
+        return json_dumps({"ok": True, "message": "Poll created."})
     except Exception as e:
-        logger.exception(f"telegram_create_poll failed (chat_id={chat_id}, question='{question}')")
+        logger.exception("telegram_create_poll failed (chat_id=%s, question='%s')", chat_id, question)
         return log_and_format_error(
             "create_poll", e, chat_id=chat_id, question=question, options=options
         )
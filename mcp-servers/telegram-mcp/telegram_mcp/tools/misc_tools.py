@@ -7,21 +7,26 @@ from mcp.server.fastmcp import FastMCP
 from telethon import TelegramClient, functions, utils
 from telethon.tl.types import *
 import telethon.errors.rpcerrorlist
-import logging
 import json
 import os
 from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Union, Any
 
 # Import shared utilities
-from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, get_entity_with_fallback
+from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, json_dumps, get_entity_with_fallback
 from ..utils.errors import log_and_format_error, ErrorCategory
 
 # Import configuration
 from ..config import client, logger
 
-# Get logger
-logger = logging.getLogger("telegram_mcp")
+# Older Telethon versions lack the notify settings type; mute/unmute then pass raw settings
+try:
+    from telethon.tl.types import InputPeerNotifySettings
+
+    _HAS_NOTIFY_SETTINGS = True
+except ImportError:
+    InputPeerNotifySettings = None
+    _HAS_NOTIFY_SETTINGS = False
 
 
 async def telegram_list_topics(
@@ -62,41 +67,36 @@ async def telegram_list_topics(
             )
         )
 
-        topics = getattr(result, "topics", None) or []
+        topics = result.topics
         if not topics:
             return "No topics found for this chat."
 
-        messages_map = {}
-        if getattr(result, "messages", None):
-            messages_map = {message.id: message for message in result.messages}
+        get_message = {message.id: message for message in result.messages}.get
 
         lines = []
         for topic in topics:
-            line_parts = [f"Topic ID: {topic.id}"]
-
-            title = getattr(topic, "title", None) or "(no title)"
-            line_parts.append(f"Title: {title}")
+            if type(topic) is ForumTopicDeleted:
+                # Deleted topics carry nothing but their id
+                lines.append(f"Topic ID: {topic.id} | Title: (no title)")
+                continue
 
-            total_messages = getattr(topic, "total_messages", None)
-            if total_messages is not None:
-                line_parts.append(f"Messages: {total_messages}")
+            line = f"Topic ID: {topic.id} | Title: {topic.title or '(no title)'}"
 
-            unread_count = getattr(topic, "unread_count", None)
-            if unread_count:
-                line_parts.append(f"Unread: {unread_count}")
+            if topic.unread_count:
+                line += f" | Unread: {topic.unread_count}"
 
-            if getattr(topic, "closed", False):
-                line_parts.append("Closed: Yes")
+            if topic.closed:
+                line += " | Closed: Yes"
 
-            if getattr(topic, "hidden", False):
-                line_parts.append("Hidden: Yes")
+            if topic.hidden:
+                line += " | Hidden: Yes"
 
-            top_message_id = getattr(topic, "top_message", None)
-            top_message = messages_map.get(top_message_id)
-            if top_message and getattr(top_message, "date", None):
-                line_parts.append(f"Last Activity: {top_message.date.isoformat()}")
+            # MessageEmpty has no date
+            top_message_date = getattr(get_message(topic.top_message), "date", None)
+            if top_message_date:
+                line += f" | Last Activity: {top_message_date.isoformat()}"
 
-            lines.append(" | ".join(line_parts))
+            lines.append(line)
 
         return "\n".join(lines)
     except Exception as e:
@@ -122,7 +122,7 @@ async def telegram_search_public_chats(query: str) -> str:
     """
     try:
         result = await client(functions.contacts.SearchRequest(q=query, limit=20))
-        return json.dumps([format_entity(u) for u in result.users], indent=2)
+        return json_dumps([format_entity(u) for u in result.users])
     except Exception as e:
         return log_and_format_error("telegram_search_public_chats", e, query=query)
 
@@ -147,35 +147,30 @@ async def telegram_mute_chat(chat_id: int) -> str:
     Mute notifications for a chat.
     """
     try:
-        from telethon.tl.types import InputPeerNotifySettings
+        if _HAS_NOTIFY_SETTINGS:
+            peer = await get_entity_with_fallback(client, chat_id)
+            await client(
+                functions.account.UpdateNotifySettingsRequest(
+                    peer=peer, settings=InputPeerNotifySettings(mute_until=2**31 - 1)
+                )
+            )
+            return f"Chat {chat_id} muted."
 
-        peer = await get_entity_with_fallback(client, chat_id)
+        # Alternative approach directly using raw API
+        peer = await client.get_input_entity(chat_id)
         await client(
             functions.account.UpdateNotifySettingsRequest(
-                peer=peer, settings=InputPeerNotifySettings(mute_until=2**31 - 1)
+                peer=peer,
+                settings={
+                    "mute_until": 2**31 - 1,  # Far future
+                    "show_previews": False,
+                    "silent": True,
+                },
             )
         )
-        return f"Chat {chat_id} muted."
-    except (ImportError, AttributeError) as type_err:
-        try:
-            # Alternative approach directly using raw API
-            peer = await client.get_input_entity(chat_id)
-            await client(
-                functions.account.UpdateNotifySettingsRequest(
-                    peer=peer,
-                    settings={
-                        "mute_until": 2**31 - 1,  # Far future
-                        "show_previews": False,
-                        "silent": True,
-                    },
-                )
-            )
-            return f"Chat {chat_id} muted (using alternative method)."
-        except Exception as alt_e:
-            logger.exception(f"telegram_mute_chat (alt method) failed (chat_id={chat_id})")
-            return log_and_format_error("telegram_mute_chat", alt_e, chat_id=chat_id)
+        return f"Chat {chat_id} muted (using alternative method)."
     except Exception as e:
-        logger.exception(f"telegram_mute_chat failed (chat_id={chat_id})")
+        logger.exception("telegram_mute_chat failed (chat_id=%s)", chat_id)
         return log_and_format_error("telegram_mute_chat", e, chat_id=chat_id)
 
 
@@ -186,35 +181,30 @@ async def telegram_unmute_chat(chat_id: int) -> str:
     Unmute notifications for a chat.
     """
     try:
-        from telethon.tl.types import InputPeerNotifySettings
+        if _HAS_NOTIFY_SETTINGS:
+            peer = await get_entity_with_fallback(client, chat_id)
+            await client(
+                functions.account.UpdateNotifySettingsRequest(
+                    peer=peer, settings=InputPeerNotifySettings(mute_until=0)
+                )
+            )
+            return f"Chat {chat_id} unmuted."
 
-        peer = await get_entity_with_fallback(client, chat_id)
+        # Alternative approach directly using raw API
+        peer = await client.get_input_entity(chat_id)
         await client(
             functions.account.UpdateNotifySettingsRequest(
-                peer=peer, settings=InputPeerNotifySettings(mute_until=0)
+                peer=peer,
+                settings={
+                    "mute_until": 0,  # Unmute (current time)
+                    "show_previews": True,
+                    "silent": False,
+                },
             )
         )
-        return f"Chat {chat_id} unmuted."
-    except (ImportError, AttributeError) as type_err:
-        try:
-            # Alternative approach directly using raw API
-            peer = await client.get_input_entity(chat_id)
-            await client(
-                functions.account.UpdateNotifySettingsRequest(
-                    peer=peer,
-                    settings={
-                        "mute_until": 0,  # Unmute (current time)
-                        "show_previews": True,
-                        "silent": False,
-                    },
-                )
-            )
-            return f"Chat {chat_id} unmuted (using alternative method)."
-        except Exception as alt_e:
-            logger.exception(f"telegram_unmute_chat (alt method) failed (chat_id={chat_id})")
-            return log_and_format_error("telegram_unmute_chat", alt_e, chat_id=chat_id)
+        return f"Chat {chat_id} unmuted (using alternative method)."
     except Exception as e:
-        logger.exception(f"telegram_unmute_chat failed (chat_id={chat_id})")
+        logger.exception("telegram_unmute_chat failed (chat_id=%s)", chat_id)
         return log_and_format_error("telegram_unmute_chat", e, chat_id=chat_id)
 
 
@@ -231,28 +221,10 @@ async def telegram_get_bot_info(bot_username: str) -> str:
 
         result = await client(functions.users.GetFullUserRequest(id=entity))
 
-        # Create a more structured, serializable response
-        if hasattr(result, "to_dict"):
-            # Use custom serializer to handle non-serializable types
-            return json.dumps(result.to_dict(), indent=2, default=json_serializer)
-        else:
-            # Fallback if to_dict is not available
-            info = {
-                "bot_info": {
-                    "id": entity.id,
-                    "username": entity.username,
-                    "first_name": entity.first_name,
-                    "last_name": getattr(entity, "last_name", ""),
-                    "is_bot": getattr(entity, "bot", False),
-                    "verified": getattr(entity, "verified", False),
-                }
-            }
-            if hasattr(result, "full_user") and hasattr(result.full_user, "about"):
-                info["bot_info"]["about"] = result.full_user.about
-
-            return json.dumps(info, indent=2)
+        # TL objects are expanded by json_serializer while encoding
+        return json_dumps(result)
     except Exception as e:
-        logger.exception(f"telegram_get_bot_info failed (bot_username={bot_username})")
+        logger.exception("telegram_get_bot_info failed (bot_username=%s)", bot_username)
         return log_and_format_error("telegram_get_bot_info", e, bot_username=bot_username)
 
 
@@ -297,10 +269,10 @@ async def telegram_set_bot_commands(bot_username: str, commands: list) -> str:
 
         return f"Bot commands set for {bot_username}."
     except ImportError as ie:
-        logger.exception(f"telegram_set_bot_commands failed - ImportError: {ie}")
+        logger.exception("telegram_set_bot_commands failed - ImportError: %s", ie)
         return log_and_format_error("telegram_set_bot_commands", ie)
     except Exception as e:
-        logger.exception(f"telegram_set_bot_commands failed (bot_username={bot_username})")
+        logger.exception("telegram_set_bot_commands failed (bot_username=%s)", bot_username)
         return log_and_format_error("telegram_set_bot_commands", e, bot_username=bot_username)
 
 
@@ -14,7 +14,7 @@ from datetime import datetime, timedelta
 from typing import List, Dict, Optional, Union, Any
 
 # Import shared utilities
-from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, get_entity_with_fallback
+from ..utils.helpers import format_entity, format_message, get_sender_name, json_serializer, json_dumps, get_entity_with_fallback
 from ..utils.errors import log_and_format_error, ErrorCategory
 
 # Import configuration
@@ -30,7 +30,7 @@ async def telegram_get_me() -> str:
     """
     try:
         me = await client.get_me()
-        return json.dumps(format_entity(me), indent=2)
+        return json_dumps(format_entity(me))
     except Exception as e:
         return log_and_format_error("telegram_get_me", e)
 
@@ -218,7 +218,7 @@ async def telegram_get_user_photos(user_id: int, limit: int = 10) -> str:
         photos = await client(
             functions.photos.GetUserPhotosRequest(user_id=user, offset=0, max_id=0, limit=limit)
         )
-        return json.dumps([p.id for p in photos.photos], indent=2)
+        return json_dumps([p.id for p in photos.photos])
     except Exception as e:
         return log_and_format_error("telegram_get_user_photos", e, user_id=user_id, limit=limit)
 
@@ -230,7 +230,8 @@ async def telegram_get_user_status(user_id: int) -> str:
     Get the online status of a user.
     """
     try:
-        user = await get_entity_with_fallback(client, user_id)
+        # Status changes constantly, so don't answer from the entity cache
+        user = await get_entity_with_fallback(client, user_id, fresh=True)
         return str(user.status)
     except Exception as e:
         return log_and_format_error("telegram_get_user_status", e, user_id=user_id)
@@ -9,7 +9,7 @@ import json
 from typing import Optional
 
 # Shared utilities
-from ..utils.helpers import format_entity, json_serializer, get_entity_with_fallback
+from ..utils.helpers import format_entity, json_serializer, json_dumps, get_entity_with_fallback
 from ..utils.errors import log_and_format_error
 
 # Configuration
@@ -106,7 +106,7 @@ async def telegram_get_message_reactions(chat_id: int, message_id: int) -> str:
                     }
                 )
 
-        return json.dumps(summary, indent=2, default=json_serializer)
+        return json_dumps(summary)
     except Exception as e:
         return log_and_format_error(
             "get_message_reactions", e, chat_id=chat_id, message_id=message_id
@@ -152,7 +152,7 @@ async def telegram_get_reactors(
             "count": len(formatted),
             "users": formatted,
         }
-        return json.dumps(payload, indent=2, default=json_serializer)
+        return json_dumps(payload)
     except Exception as e:
         return log_and_format_error(
             "get_reactors",
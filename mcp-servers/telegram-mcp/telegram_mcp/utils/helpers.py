@@ -3,22 +3,81 @@ Helper functions for Telegram MCP
 Auto-generated from main.py refactoring
 """
 
+import asyncio
+import functools
 import json
+import operator
+import time
+from collections import OrderedDict
 from datetime import datetime
 from typing import Dict, Any, Optional, Union
+from telethon.tl.tlobject import TLObject
 from telethon.tl.types import User, Chat, Channel
-from telethon import utils, TelegramClient
+from telethon import errors, utils, TelegramClient
 
-async def get_entity_with_fallback(client: TelegramClient, entity_id: Union[int, str]):
+try:
+    import orjson
+except ImportError:  # stdlib json fallback, same output modulo whitespace/escaping
+    orjson = None
+
+# Resolved entities are reused for this many seconds before being fetched again
+ENTITY_CACHE_TTL = 300.0
+ENTITY_CACHE_SIZE = 1024
+
+# (id(client), entity_id) -> (expires_at, entity), kept in least-recently-used order
+_entity_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+# (id(client), entity_id) -> lookup in progress, shared by concurrent callers
+_entity_inflight: Dict[tuple, asyncio.Future] = {}
+
+# Ids that recently failed to resolve are answered from here instead of retrying Telegram
+UNRESOLVED_CACHE_TTL = 60.0
+UNRESOLVED_CACHE_SIZE = 256
+
+# (id(client), entity_id) -> (expires_at, error), kept in least-recently-used order
+_unresolved_cache: "OrderedDict[tuple, tuple]" = OrderedDict()
+
+# Errors that mean the id itself is bad, as opposed to a transient failure
+_UNRESOLVED_ERRORS = (
+    ValueError,
+    errors.PeerIdInvalidError,
+    errors.ChannelInvalidError,
+    errors.ChatIdInvalidError,
+)
+
+# Requests in flight at once for the batch tools; Telethon sleeps through short flood waits itself
+BATCH_CONCURRENCY = 10
+
+# id(client) -> User returned by client.get_me()
+_me_cache: Dict[int, Any] = {}
+
+
+def invalidate_entity_cache(client: TelegramClient, *entity_ids: Union[int, str]) -> None:
+    """Drop cached entities so the next lookup goes back to Telegram."""
+    for entity_id in entity_ids:
+        _entity_cache.pop((id(client), entity_id), None)
+
+
+async def get_entity_with_fallback(
+    client: TelegramClient,
+    entity_id: Union[int, str],
+    remember_failure: bool = False,
+    fresh: bool = False,
+):
     """
     Get entity with automatic fallback to negative ID for groups.
     
     This handles cases where groups are provided with positive IDs (should be negative).
     Telegram groups often require negative IDs, so if a positive ID fails, we try the negative.
+    Resolved entities are cached per client for ENTITY_CACHE_TTL seconds.
     
     Args:
         client: The TelegramClient instance
         entity_id: The entity ID (can be int or string like username)
+        remember_failure: If True, an id that could not be resolved re-raises the
+            same error for UNRESOLVED_CACHE_TTL seconds without contacting Telegram
+        fresh: If True, skip the entity cache and fetch from Telegram (the result still
+            refreshes the cache); for tools that report live fields such as status or titles
     
     Returns:
         The entity object
@@ -26,6 +85,99 @@ async def get_entity_with_fallback(client: TelegramClient, entity_id: Union[int,
     Raises:
         ValueError: If entity cannot be found with either ID
     """
+    key = (id(client), entity_id)
+    cached = None if fresh else _entity_cache.get(key)
+    if cached is not None:
+        expires_at, entity = cached
+        if expires_at > time.monotonic():
+            _entity_cache.move_to_end(key)
+            return entity
+        del _entity_cache[key]
+
+    if remember_failure:
+        failed = _unresolved_cache.get(key)
+        if failed is not None:
+            expires_at, error = failed
+            if expires_at > time.monotonic():
+                _unresolved_cache.move_to_end(key)
+                raise error.with_traceback(None)
+            del _unresolved_cache[key]
+
+    # Concurrent misses for the same id wait on one lookup instead of each sending requests
+    task = _entity_inflight.get(key)
+    if task is None:
+        task = asyncio.ensure_future(_resolve_entity(client, entity_id))
+        _entity_inflight[key] = task
+        task.add_done_callback(functools.partial(_finish_inflight, key))
+
+    try:
+        # Shielded so one caller being cancelled doesn't cancel the lookup for the others
+        entity = await asyncio.shield(task)
+    except _UNRESOLVED_ERRORS as e:
+        if remember_failure:
+            _unresolved_cache[key] = (time.monotonic() + UNRESOLVED_CACHE_TTL, e)
+            if len(_unresolved_cache) > UNRESOLVED_CACHE_SIZE:
+                _unresolved_cache.popitem(last=False)
+        raise
+    _unresolved_cache.pop(key, None)
+    _entity_cache[key] = (time.monotonic() + ENTITY_CACHE_TTL, entity)
+    if len(_entity_cache) > ENTITY_CACHE_SIZE:
+        _entity_cache.popitem(last=False)
+    return entity
+
+
+def _finish_inflight(key: tuple, task: asyncio.Future) -> None:
+    """Forget a finished lookup, marking its error as retrieved in case every waiter was cancelled."""
+    _entity_inflight.pop(key, None)
+    if not task.cancelled():
+        task.exception()
+
+
+async def get_input_entity_with_fallback(client: TelegramClient, entity_id: Union[int, str]):
+    """
+    Get an InputPeer for requests that only need a reference to the peer.
+
+    Uses Telethon's session cache, which usually answers numeric ids without a request,
+    and falls back to get_entity_with_fallback (negative group ids, entity cache) otherwise.
+    """
+    try:
+        return await client.get_input_entity(entity_id)
+    except ValueError:
+        return utils.get_input_peer(await get_entity_with_fallback(client, entity_id))
+
+
+async def run_batch(func, ids, concurrency: int = BATCH_CONCURRENCY) -> tuple:
+    """
+    Await func(id) for each distinct id, at most `concurrency` at a time.
+
+    Returns:
+        (ids that succeeded, [(id, exception), ...] for those that failed), in input order
+    """
+    ids = list(dict.fromkeys(ids))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def guarded(item_id):
+        async with semaphore:
+            return await func(item_id)
+
+    results = await asyncio.gather(*(guarded(i) for i in ids), return_exceptions=True)
+    succeeded = [i for i, r in zip(ids, results) if not isinstance(r, Exception)]
+    failed = [(i, r) for i, r in zip(ids, results) if isinstance(r, Exception)]
+    return succeeded, failed
+
+
+async def get_me_cached(client: TelegramClient):
+    """Return the logged-in user, fetched once per client since it doesn't change mid-session."""
+    me = _me_cache.get(id(client))
+    if me is None:
+        me = await client.get_me()
+        if me is not None:
+            _me_cache[id(client)] = me
+    return me
+
+
+async def _resolve_entity(client: TelegramClient, entity_id: Union[int, str]):
+    """Look up an entity, retrying positive integer IDs as negative group IDs."""
     try:
         return await client.get_entity(entity_id)
     except (ValueError, Exception) as original_error:
@@ -46,11 +198,66 @@ def json_serializer(obj):
         return obj.isoformat()
     if isinstance(obj, bytes):
         return obj.decode("utf-8", errors="replace")
+    if isinstance(obj, TLObject):
+        return obj.to_dict()
     # Add other non-serializable types as needed
     raise TypeError(f"Object of type {type(obj)} is not JSON serializable")
 
+
+def json_dumps(obj: Any, indent: bool = False) -> str:
+    """Serialize a tool result to compact JSON (indent=True pretty-prints), using orjson when installed."""
+    if orjson is not None:
+        option = orjson.OPT_NON_STR_KEYS | (orjson.OPT_INDENT_2 if indent else 0)
+        return orjson.dumps(obj, default=json_serializer, option=option).decode()
+    return json.dumps(obj, indent=2 if indent else None, default=json_serializer)
+
+
+class _ReadOnlyDict(dict):
+    """A dict that rejects in-place changes, for results shared between callers through a cache.
+
+    Still a real dict, so orjson, json and pydantic serialize it as one; copy it with dict(...) to edit.
+    """
+
+    def _read_only(self, *args, **kwargs):
+        raise TypeError("shared cached dict is read-only; copy it with dict(...) first")
+
+    __setitem__ = __delitem__ = __ior__ = _read_only
+    clear = pop = popitem = setdefault = update = _read_only
+
+    def __copy__(self):
+        return dict(self)
+
+    def __deepcopy__(self, memo):
+        # Values are str/int only, so a shallow copy is already independent
+        return dict(self)
+
+
+# Fetches every User field format_entity needs in one C-level call
+_get_user_fields = operator.attrgetter("id", "first_name", "last_name", "username", "phone")
+
+@functools.lru_cache(maxsize=4096)
+def _format_user(entity_id, first_name, last_name, username, phone) -> Dict[str, Any]:
+    """Formatted user dict, memoized on the fields that appear in the output."""
+    result = {
+        "id": entity_id,
+        "name": " ".join(filter(None, (first_name, last_name))),
+        "type": "user",
+    }
+    if username:
+        result["username"] = username
+    if phone:
+        result["phone"] = phone
+    return _ReadOnlyDict(result)
+
+
 def format_entity(entity) -> Dict[str, Any]:
-    """Helper function to format entity information consistently."""
+    """Helper function to format entity information consistently.
+
+    Users are returned from a shared cache as read-only dicts; copy one with dict(...) to modify it.
+    """
+    if isinstance(entity, User):
+        return _format_user(*_get_user_fields(entity))
+
     result = {"id": entity.id}
 
     if hasattr(entity, "title"):
@@ -187,16 +394,43 @@ def truncate(text: Optional[str], max_len: int = 100) -> str:
         return ""
     return text if len(text) <= max_len else text[: max_len - 3] + "..."
 
+def _user_name_kind(entity: User) -> tuple:
+    name = entity.first_name
+    if entity.last_name:
+        name = f"{name} {entity.last_name}"
+    return name, "user"
+
+
+def _chat_name_kind(entity: Chat) -> tuple:
+    return entity.title or "Unknown", "group"
+
+
+def _channel_name_kind(entity: Channel) -> tuple:
+    return entity.title or "Unknown", "group" if entity.megagroup else None
+
+
+# Exact entity type -> (name, kind) extractor; other types take the generic getattr path
+_DIALOG_NAME_KIND = {
+    User: _user_name_kind,
+    Chat: _chat_name_kind,
+    Channel: _channel_name_kind,
+}
+
 def format_dialog_summary(dialog) -> Dict[str, Any]:
     """Compact summary for a Telethon dialog suitable for JSON returns."""
     entity = dialog.entity
-    name = getattr(entity, "title", None) or getattr(entity, "first_name", "Unknown")
-    if hasattr(entity, "last_name") and getattr(entity, "last_name", None):
-        name = f"{name} {entity.last_name}"
+    name_kind = _DIALOG_NAME_KIND.get(type(entity))
+    if name_kind is not None:
+        name, kind = name_kind(entity)
+    else:
+        name = getattr(entity, "title", None) or getattr(entity, "first_name", "Unknown")
+        if hasattr(entity, "last_name") and getattr(entity, "last_name", None):
+            name = f"{name} {entity.last_name}"
+        kind = get_entity_kind(entity)
     summary = {
         "id": entity.id,
         "name": name,
-        "kind": get_entity_kind(entity),
+        "kind": kind,
         "unread": getattr(dialog, "unread_count", 0) or 0,
     }
     if getattr(dialog, "message", None):
@@ -211,16 +445,21 @@ def format_dialog_summary(dialog) -> Dict[str, Any]:
 
 def get_sender_name(message) -> str:
     """Helper function to get sender name from a message."""
-    if not message.sender:
+    return get_entity_name(message.sender)
+
+
+def get_entity_name(entity) -> str:
+    """Display name of a message sender entity (user, chat or channel), or "Unknown"."""
+    if not entity:
         return "Unknown"
 
     # Check for group/channel title first
-    if hasattr(message.sender, "title") and message.sender.title:
-        return message.sender.title
-    elif hasattr(message.sender, "first_name"):
+    if hasattr(entity, "title") and entity.title:
+        return entity.title
+    elif hasattr(entity, "first_name"):
         # User sender
-        first_name = getattr(message.sender, "first_name", "") or ""
-        last_name = getattr(message.sender, "last_name", "") or ""
+        first_name = getattr(entity, "first_name", "") or ""
+        last_name = getattr(entity, "last_name", "") or ""
         full_name = f"{first_name} {last_name}".strip()
         return full_name if full_name else "Unknown"
     else:
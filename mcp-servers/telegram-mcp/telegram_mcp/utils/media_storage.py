@@ -14,6 +14,9 @@ import logging
 
 logger = logging.getLogger("telegram_mcp")
 
+# Suffix of the cached base64 encoding written next to a media file
+B64_SIDECAR_SUFFIX = ".b64"
+
 
 class MediaStorage:
     """Manages persistent storage of downloaded Telegram media files."""
@@ -54,7 +57,7 @@ class MediaStorage:
         """Save the media index to disk."""
         try:
             with open(self.index_file, 'w', encoding='utf-8') as f:
-                json.dump(self.index, f, indent=2, ensure_ascii=False)
+                json.dump(self.index, f, ensure_ascii=False, separators=(",", ":"))
         except IOError as e:
             logger.error(f"Failed to save media index: {e}")
             raise
@@ -68,6 +71,16 @@ class MediaStorage:
         filename = f"chat{chat_id}_msg{message_id}{extension}"
         return self.base_dir / filename
     
+    def _remove_sidecar(self, file_path: str):
+        """Remove the cached base64 sidecar for a media file, if any."""
+        sidecar_path = file_path + B64_SIDECAR_SUFFIX
+        try:
+            os.remove(sidecar_path)
+        except FileNotFoundError:
+            pass
+        except OSError as e:
+            logger.warning(f"Failed to delete base64 cache {sidecar_path}: {e}")
+    
     def save_media(self, chat_id: int, message_id: int, source_path: str, mime_type: Optional[str] = None) -> str:
         """
         Save media file to storage and update index.
@@ -111,29 +124,61 @@ class MediaStorage:
             }
             extension = ext_map.get(mime_type, '.bin')
         
-        # Generate destination path
-        dest_path = self._get_file_path(chat_id, message_id, extension)
-        
         # Copy file to storage
+        dest_path = self.allocate_path(chat_id, message_id, extension)
         shutil.copy2(source_path, dest_path)
+        self.register_media(chat_id, message_id, dest_path, mime_type)
         
-        # Get file size
-        file_size = dest_path.stat().st_size
+        logger.info(f"Saved media: {source_path} -> {dest_path}")
+        return dest_path
+    
+    def allocate_path(self, chat_id: int, message_id: int, extension: Optional[str] = None) -> str:
+        """
+        Get the storage path for a media file so it can be written there directly.
+        
+        Any base64 cache of a previous copy is dropped. Call register_media once the
+        file has been written.
+        
+        Args:
+            chat_id: Telegram chat ID
+            message_id: Telegram message ID
+            extension: File extension including the dot (defaults to .bin)
+            
+        Returns:
+            Path the media file should be written to
+        """
+        dest_path = str(self._get_file_path(chat_id, message_id, extension or ".bin"))
+        self._remove_sidecar(dest_path)
+        return dest_path
+    
+    def register_media(self, chat_id: int, message_id: int, path: str, mime_type: Optional[str] = None, size: Optional[int] = None, media_info: Optional[Dict] = None) -> Dict:
+        """
+        Add a media file already in storage to the index.
         
-        # Update index
+        Args:
+            chat_id: Telegram chat ID
+            message_id: Telegram message ID
+            path: Path returned by allocate_path, after the file was written
+            mime_type: MIME type of the media (defaults to application/octet-stream)
+            size: File size in bytes, when already known (read from disk otherwise)
+            media_info: Telegram-side description of the media, kept so it can be served without a request
+            
+        Returns:
+            The index entry for the media file
+        """
         key = self._get_key(chat_id, message_id)
         self.index[key] = {
-            "path": str(dest_path),
-            "mime_type": mime_type,
+            "path": str(path),
+            "mime_type": mime_type or "application/octet-stream",
             "timestamp": datetime.now().isoformat(),
-            "size": file_size,
-            "extension": extension
+            "size": size if size is not None else os.path.getsize(path),
+            "extension": os.path.splitext(str(path))[1],
         }
+        if media_info is not None:
+            self.index[key]["media_info"] = media_info
         
         self._save_index()
-        
-        logger.info(f"Saved media: {source_path} -> {dest_path}")
-        return str(dest_path)
+        return self.index[key]
     
     def get_media(self, chat_id: int, message_id: int) -> Optional[Dict]:
         """
@@ -185,6 +230,7 @@ class MediaStorage:
             else:
                 # Mark stale entries for removal
                 stale_keys.append(key)
+                self._remove_sidecar(media_info["path"])
         
         # Remove stale entries after iteration
         if stale_keys:
@@ -194,6 +240,26 @@ class MediaStorage:
         
         return valid_media
     
+    def list_media_public(self) -> List[Dict]:
+        """
+        List all stored media in the shape returned by the MCP tools.
+        
+        Returns:
+            List of dicts with chat_id, message_id, file, mime_type, size, path and timestamp
+        """
+        return [
+            {
+                "chat_id": media["chat_id"],
+                "message_id": media["message_id"],
+                "file": os.path.basename(media["path"]),
+                "mime_type": media["mime_type"],
+                "size": media["size"],
+                "path": media["path"],
+                "timestamp": media["timestamp"],
+            }
+            for media in self.list_media()
+        ]
+    
     def delete_media(self, chat_id: int, message_id: int) -> bool:
         """
         Delete media file and remove from index.
@@ -218,6 +284,7 @@ class MediaStorage:
                 os.remove(file_path)
             except OSError as e:
                 logger.warning(f"Failed to delete media file {file_path}: {e}")
+        self._remove_sidecar(file_path)
         
         # Remove from index
         del self.index[key]
@@ -226,6 +293,38 @@ class MediaStorage:
         logger.info(f"Deleted media: {file_path}")
         return True
     
+    def delete_by_chat(self, chat_id: int) -> int:
+        """
+        Delete all media files of a chat and remove them from the index.
+        
+        Args:
+            chat_id: Telegram chat ID
+            
+        Returns:
+            Number of files deleted
+        """
+        prefix = self._get_key(chat_id, "")
+        keys = [key for key in self.index if key.startswith(prefix)]
+        if not keys:
+            return 0
+        
+        deleted_count = 0
+        for key in keys:
+            file_path = self.index.pop(key)["path"]
+            try:
+                os.remove(file_path)
+                deleted_count += 1
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Failed to delete media file {file_path}: {e}")
+            self._remove_sidecar(file_path)
+        
+        self._save_index()
+        
+        logger.info(f"Deleted chat media: chat {chat_id}, {deleted_count} files deleted")
+        return deleted_count
+    
     def clear_all_media(self) -> int:
         """
         Clear all stored media files and index.
@@ -243,6 +342,7 @@ class MediaStorage:
                     deleted_count += 1
                 except OSError as e:
                     logger.warning(f"Failed to delete media file {file_path}: {e}")
+            self._remove_sidecar(file_path)
         
         self.index.clear()
         self._save_index()
@@ -250,14 +350,18 @@ class MediaStorage:
         logger.info(f"Cleared all media: {deleted_count} files deleted")
         return deleted_count
     
-    def get_storage_stats(self) -> Dict:
+    def get_storage_stats(self, media_list: Optional[List[Dict]] = None) -> Dict:
         """
         Get storage statistics.
         
+        Args:
+            media_list: Result of a list_media call to reuse instead of rescanning storage
+            
         Returns:
             Dictionary with storage stats
         """
-        media_list = self.list_media()
+        if media_list is None:
+            media_list = self.list_media()
         total_size = sum(media["size"] for media in media_list)
         
         return {
@@ -0,0 +1,15 @@
+"""
+Shared pytest setup.
+
+telegram_mcp.config builds the Telegram client at import time from environment variables,
+so give the unit tests harmless defaults (no network access happens until a tool is called).
+"""
+
+import os
+import tempfile
+
+os.environ.setdefault("TELEGRAM_API_ID", "1")
+os.environ.setdefault("TELEGRAM_API_HASH", "test")
+os.environ.setdefault(
+    "TELEGRAM_SESSION_NAME", os.path.join(tempfile.mkdtemp(prefix="telegram-mcp-test-"), "test")
+)
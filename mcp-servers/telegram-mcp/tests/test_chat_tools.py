@@ -0,0 +1,202 @@
+"""
+Unit tests for pure helpers in telegram_mcp.tools.chat_tools.
+
+Usage:
+    pytest tests/test_chat_tools.py -v
+"""
+
+import asyncio
+from datetime import datetime, timezone
+from types import SimpleNamespace
+
+import pytest
+from telethon.tl.types import (
+    Channel,
+    Chat,
+    ChatParticipants,
+    ChatPhotoEmpty,
+    InputPeerChannel,
+    InputPeerChat,
+    InputPeerUser,
+    MessageActionChatCreate,
+    MessageService,
+    PeerChat,
+    PeerUser,
+    UpdateChatParticipants,
+    UpdateNewMessage,
+    Updates,
+    User,
+)
+from telethon.errors import InviteHashExpiredError, RPCError
+from telethon.tl.types.messages import InvitedUsers
+
+from telegram_mcp.tools import chat_tools
+from telegram_mcp.tools.chat_tools import (
+    _created_chat_id,
+    _decode_dialog_cursor,
+    _encode_dialog_cursor,
+    _join_error_message,
+    _JOIN_ERROR_MESSAGES,
+)
+
+
+DATE = datetime(2026, 3, 14, 15, 9, 26, tzinfo=timezone.utc)
+
+
+def make_dialog(entity, message_id=42, date=DATE):
+    """Minimal stand-in for a telethon Dialog: only .entity and .message are read."""
+    message = SimpleNamespace(id=message_id, date=date) if message_id is not None else None
+    return SimpleNamespace(entity=entity, message=message)
+
+
+# --- Dialog cursor ---
+
+
+@pytest.mark.parametrize(
+    "entity, expected_peer",
+    [
+        (User(id=1001, access_hash=-77, first_name="Ann"), InputPeerUser(1001, -77)),
+        (
+            Channel(id=2002, title="c", photo=ChatPhotoEmpty(), date=DATE, access_hash=88, megagroup=True),
+            InputPeerChannel(2002, 88),
+        ),
+        (
+            Chat(id=3003, title="g", photo=ChatPhotoEmpty(), participants_count=2, date=DATE, version=1),
+            InputPeerChat(3003),
+        ),
+    ],
+)
+def test_dialog_cursor_round_trip(entity, expected_peer):
+    """A cursor decodes back to the dialog's offset date, message id and input peer."""
+    cursor = _encode_dialog_cursor(make_dialog(entity))
+
+    offset_date, offset_id, offset_peer = _decode_dialog_cursor(cursor)
+
+    assert offset_date == DATE
+    assert offset_id == 42
+    assert offset_peer == expected_peer
+
+
+def test_dialog_cursor_is_url_safe_text():
+    """Cursors are plain ASCII strings that survive being passed around as tool arguments."""
+    cursor = _encode_dialog_cursor(make_dialog(User(id=1, access_hash=2**62)))
+
+    assert isinstance(cursor, str)
+    assert cursor.isascii()
+    assert not set(cursor) & set("+/ ")
+
+
+def test_dialog_cursor_without_message():
+    """Dialogs without a last message cannot be used as an offset."""
+    assert _encode_dialog_cursor(make_dialog(User(id=1), message_id=None)) is None
+
+
+@pytest.mark.parametrize("cursor", ["", "not a cursor", "e30=", "eyJkIjogMX0="])
+def test_dialog_cursor_invalid(cursor):
+    """Garbage or incomplete cursors raise ValueError rather than a stray KeyError."""
+    with pytest.raises(ValueError):
+        _decode_dialog_cursor(cursor)
+
+
+# --- Created chat id ---
+
+
+def make_group(chat_id):
+    return Chat(id=chat_id, title="g", photo=ChatPhotoEmpty(), participants_count=2, date=DATE, version=1)
+
+
+def make_updates(updates=(), chats=()):
+    return Updates(updates=list(updates), users=[], chats=list(chats), date=DATE, seq=0)
+
+
+def test_created_chat_id_from_invited_users():
+    """Current layers wrap the Updates in messages.InvitedUsers."""
+    result = InvitedUsers(updates=make_updates(chats=[make_group(555)]), missing_invitees=[])
+
+    assert _created_chat_id(result) == 555
+
+
+def test_created_chat_id_from_updates_chats():
+    """Older layers return the Updates directly."""
+    assert _created_chat_id(make_updates(chats=[make_group(556)])) == 556
+
+
+def test_created_chat_id_from_participants_update():
+    """Without chats, the id is read from updateChatParticipants."""
+    update = UpdateChatParticipants(ChatParticipants(chat_id=557, participants=[], version=1))
+    result = InvitedUsers(updates=make_updates([update]), missing_invitees=[])
+
+    assert _created_chat_id(result) == 557
+
+
+def test_created_chat_id_from_service_message():
+    """Failing that, from the messageActionChatCreate service message."""
+    message = MessageService(
+        id=1,
+        peer_id=PeerChat(558),
+        from_id=PeerUser(1),
+        date=DATE,
+        action=MessageActionChatCreate(title="g", users=[1]),
+    )
+    result = make_updates([UpdateNewMessage(message, pts=1, pts_count=1)])
+
+    assert _created_chat_id(result) == 558
+
+
+def test_created_chat_id_unknown_shape():
+    """Nothing recognisable yields None; create_group then replies without an id."""
+    assert _created_chat_id(make_updates()) is None
+    assert _created_chat_id(InvitedUsers(updates=make_updates(), missing_invitees=[])) is None
+
+
+# --- Invite link export ---
+
+
+def test_invite_link_export_is_shared_and_forgotten(monkeypatch):
+    """Concurrent exports for one chat send one request, and no per-chat state outlives it."""
+    requests = []
+
+    async def fake_client(request):
+        requests.append(request)
+        await asyncio.sleep(0.01)
+        return SimpleNamespace(link="https://t.me/+abc", expire_date=None)
+
+    monkeypatch.setattr(chat_tools, "client", fake_client)
+    monkeypatch.setattr(chat_tools, "_invite_link_cache", {})
+    group = make_group(700)
+
+    async def export_three():
+        return await asyncio.gather(*(chat_tools._export_invite_link(group) for _ in range(3)))
+
+    links = asyncio.run(export_three())
+
+    assert links == ["https://t.me/+abc"] * 3
+    assert len(requests) == 1
+    assert chat_tools._invite_link_inflight == {}
+
+
+# --- Join error classification ---
+
+
+@pytest.mark.parametrize(
+    "error, kind",
+    [
+        (InviteHashExpiredError(None), "expired"),
+        # Text matches follow the old elif order, not the position in the message
+        (RPCError(None, "ADMIN rights EXPIRED", 400), "expired"),
+        (RPCError(None, "INVITE_HASH_INVALID for admin", 400), "invalid"),
+        (RPCError(None, "participant already joined", 400), "already"),
+        (RPCError(None, "USERS_TOO_MUCH", 400), "full"),
+        # Non-RPC failures are classified by text as well
+        (ValueError("chat requires admin approval"), "admin"),
+        (RuntimeError("too many participants"), "full"),
+    ],
+)
+def test_join_error_message(error, kind):
+    assert _join_error_message(error) == _JOIN_ERROR_MESSAGES[kind]
+
+
+@pytest.mark.parametrize("error", [ValueError("boom"), RPCError(None, "already", 400)])
+def test_join_error_message_unexpected(error):
+    """Unrecognised failures return None so the caller re-raises them."""
+    assert _join_error_message(error) is None
@@ -0,0 +1,131 @@
+"""
+Unit tests for pure helpers in telegram_mcp.tools.contact_tools.
+
+Usage:
+    pytest tests/test_contact_tools.py -v
+"""
+
+import asyncio
+import ctypes
+
+import pytest
+from telethon.tl.types import Contact, User
+from telethon.tl.types.contacts import Contacts, ContactsNotModified
+
+from telegram_mcp.tools import contact_tools
+from telegram_mcp.tools.contact_tools import _contacts_hash
+
+
+def reference_hash(ids):
+    """Hash generation as documented at https://core.telegram.org/api/offsets#hash-generation,
+    computed with C 64-bit integers instead of Python masking."""
+    h = ctypes.c_uint64(0)
+    for user_id in ids:
+        h.value ^= h.value >> 21
+        h.value ^= h.value << 35
+        h.value ^= h.value >> 4
+        h.value += user_id
+    return ctypes.c_int64(h.value).value
+
+
+# --- Contacts hash ---
+
+
+def test_contacts_hash_empty():
+    """An empty contact list with nothing saved hashes to 0, which also means "no cached copy"."""
+    assert _contacts_hash(0, []) == 0
+
+
+def test_contacts_hash_known_values():
+    """Hand-computed: each step is h ^= h >> 21; h ^= h << 35; h ^= h >> 4; h += next."""
+    # 0 -> 0, then 1 -> 1, then 1 ^ (1 << 35) ^ (1 << 31) + 2
+    assert _contacts_hash(0, [2, 1]) == 36507222019
+    # 3 -> 3 ^ (3 << 35) ^ (3 << 31) + 1
+    assert _contacts_hash(3, [1]) == 109521666052
+
+
+@pytest.mark.parametrize(
+    "saved_count, ids",
+    [
+        (0, [777000]),
+        (2, [10, 20, 30]),
+        (7, [5_000_000_000, 123456789, 42, 7_777_777_777]),
+        (0, list(range(1, 500, 7))),
+    ],
+)
+def test_contacts_hash_matches_reference(saved_count, ids):
+    """Matches the documented algorithm over saved_count followed by the sorted ids."""
+    assert _contacts_hash(saved_count, ids) == reference_hash([saved_count, *sorted(ids)])
+
+
+def test_contacts_hash_depends_on_saved_count():
+    """The same contacts with a different saved_count must not produce the same hash."""
+    assert _contacts_hash(0, [10, 20]) != _contacts_hash(1, [10, 20])
+
+
+def test_contacts_hash_ignores_input_order():
+    """Contacts arrive in arbitrary order; the hash is taken over sorted ids."""
+    ids = [900, 3, 512, 77]
+    assert _contacts_hash(1, ids) == _contacts_hash(1, reversed(ids)) == _contacts_hash(1, sorted(ids))
+
+
+def test_contacts_hash_is_signed_long():
+    """Large accumulators wrap to a negative value, as GetContactsRequest's long expects."""
+    hashes = [_contacts_hash(0, range(1, n)) for n in range(2, 200)]
+
+    assert all(-(1 << 63) <= h < (1 << 63) for h in hashes)
+    assert any(h < 0 for h in hashes)
+
+
+def test_get_contacts_sends_seeded_hash(monkeypatch):
+    """The next GetContactsRequest carries the hash of the last response, so Telegram can answer not-modified."""
+    users = [User(id=30, first_name="C"), User(id=10, first_name="A")]
+    full = Contacts(
+        contacts=[Contact(user_id=30, mutual=False), Contact(user_id=10, mutual=True)],
+        saved_count=4,
+        users=users,
+    )
+    sent_hashes = []
+
+    async def fake_client(request):
+        sent_hashes.append(request.hash)
+        return full if len(sent_hashes) == 1 else ContactsNotModified()
+
+    monkeypatch.setattr(contact_tools, "client", fake_client)
+    contact_tools._invalidate_contacts()
+
+    async def fetch_twice():
+        return await contact_tools._get_contacts(), await contact_tools._get_contacts()
+
+    first, second = asyncio.run(fetch_twice())
+    contact_tools._invalidate_contacts()
+
+    assert sent_hashes == [0, reference_hash([4, 10, 30])]
+    assert first == second == users
+
+
+def test_get_contact_ids_served_from_fresh_cache(monkeypatch):
+    """Within CONTACTS_CACHE_TTL of a fetch, contact ids need no request at all."""
+    full = Contacts(contacts=[Contact(user_id=10, mutual=True)], saved_count=0, users=[User(id=10)])
+    requests = []
+
+    async def fake_client(request):
+        requests.append(request)
+        return full
+
+    monkeypatch.setattr(contact_tools, "client", fake_client)
+    contact_tools._invalidate_contacts()
+
+    async def calls():
+        first = await contact_tools.telegram_get_contact_ids()
+        second = await contact_tools.telegram_get_contact_ids()
+        contact_tools._invalidate_contacts()
+        third = await contact_tools.telegram_get_contact_ids()
+        return first, second, third
+
+    first, second, third = asyncio.run(calls())
+    contact_tools._invalidate_contacts()
+
+    assert first == second == third == {"ok": True, "ids": [10]}
+    # One fetch, then memory, then a refetch after invalidation
+    assert len(requests) == 2
@@ -0,0 +1,119 @@
+"""
+Unit tests for telegram_mcp.utils.helpers.
+
+Usage:
+    pytest tests/test_helpers.py -v
+"""
+
+import asyncio
+
+from types import SimpleNamespace
+
+from telegram_mcp.utils.helpers import get_entity_with_fallback, run_batch
+
+
+# --- run_batch ---
+
+
+def test_run_batch_dedupes_and_keeps_input_order():
+    """Each distinct id is awaited once; results follow first-seen input order, not completion order."""
+    calls = []
+
+    async def func(item_id):
+        calls.append(item_id)
+        # Later ids finish first
+        await asyncio.sleep(0.001 * (10 - item_id))
+
+    succeeded, failed = asyncio.run(run_batch(func, [3, 1, 3, 2, 1, 5]))
+
+    assert sorted(calls) == [1, 2, 3, 5]
+    assert succeeded == [3, 1, 2, 5]
+    assert failed == []
+
+
+def test_run_batch_splits_failures():
+    """Exceptions are collected per id, in input order, without stopping the other calls."""
+    errors = {}
+
+    async def func(item_id):
+        if item_id % 2:
+            errors[item_id] = ValueError(item_id)
+            raise errors[item_id]
+
+    succeeded, failed = asyncio.run(run_batch(func, [4, 1, 2, 3, 1]))
+
+    assert succeeded == [4, 2]
+    assert failed == [(1, errors[1]), (3, errors[3])]
+
+
+def test_run_batch_limits_concurrency():
+    """At most `concurrency` calls are in flight at once."""
+    running = 0
+    peak = 0
+
+    async def func(item_id):
+        nonlocal running, peak
+        running += 1
+        peak = max(peak, running)
+        await asyncio.sleep(0.001)
+        running -= 1
+
+    succeeded, _ = asyncio.run(run_batch(func, range(20), concurrency=3))
+
+    assert succeeded == list(range(20))
+    assert peak == 3
+
+
+def test_run_batch_empty():
+    """No ids means no calls and two empty lists."""
+
+    async def func(item_id):
+        raise AssertionError("should not be called")
+
+    assert asyncio.run(run_batch(func, [])) == ([], [])
+
+
+# --- get_entity_with_fallback ---
+
+
+class CountingClient:
+    """Fake client whose get_entity returns a new object per call, so staleness is visible."""
+
+    def __init__(self):
+        self.calls = 0
+
+    async def get_entity(self, entity_id):
+        self.calls += 1
+        return SimpleNamespace(id=entity_id, version=self.calls)
+
+
+def test_entity_cache_reuses_lookups():
+    """Repeated lookups within the TTL are answered from the cache."""
+    client = CountingClient()
+
+    async def lookups():
+        first = await get_entity_with_fallback(client, 101)
+        second = await get_entity_with_fallback(client, 101)
+        return first, second
+
+    first, second = asyncio.run(lookups())
+
+    assert client.calls == 1
+    assert second is first
+
+
+def test_entity_fresh_bypasses_and_refreshes_cache():
+    """fresh=True always asks Telegram, and later cached lookups see the newer entity."""
+    client = CountingClient()
+
+    async def lookups():
+        await get_entity_with_fallback(client, 102)
+        live = await get_entity_with_fallback(client, 102, fresh=True)
+        cached = await get_entity_with_fallback(client, 102)
+        return live, cached
+
+    live, cached = asyncio.run(lookups())
+
+    assert client.calls == 2
+    assert live.version == 2
+    assert cached is live
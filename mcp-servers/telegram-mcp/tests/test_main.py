@@ -0,0 +1,82 @@
+"""
+Process-level tests for main.py.
+
+Runs the server in a subprocess with the Telegram login stubbed out, so no network access
+or credentials are needed.
+
+Usage:
+    pytest tests/test_main.py -v
+"""
+
+import json
+import os
+import signal
+import subprocess
+import sys
+from pathlib import Path
+
+import pytest
+
+
+PROJECT_ROOT = Path(__file__).parent.parent
+
+# Start main.py as __main__ with client.start() replaced by a no-op
+LAUNCHER = """
+import runpy
+from telegram_mcp.config import client
+
+async def start(*args, **kwargs):
+    return client
+
+client.start = start
+runpy.run_path("main.py", run_name="__main__")
+"""
+
+INITIALIZE = {
+    "jsonrpc": "2.0",
+    "id": 1,
+    "method": "initialize",
+    "params": {
+        "protocolVersion": "2024-11-05",
+        "capabilities": {},
+        "clientInfo": {"name": "test", "version": "1.0.0"},
+    },
+}
+
+
+@pytest.mark.skipif(sys.platform == "win32", reason="SIGTERM cannot be delivered as a signal on Windows")
+def test_sigterm_exits_with_stdin_open(tmp_path):
+    """SIGTERM stops the server even though the stdio reader is still blocked on stdin."""
+    env = dict(
+        os.environ,
+        TELEGRAM_API_ID="1",
+        TELEGRAM_API_HASH="test",
+        TELEGRAM_SESSION_NAME=str(tmp_path / "test"),
+        HOME=str(tmp_path),
+    )
+    env.pop("TELEGRAM_SESSION_STRING", None)
+    proc = subprocess.Popen(
+        [sys.executable, "-u", "-c", LAUNCHER],
+        cwd=PROJECT_ROOT,
+        env=env,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+    )
+    try:
+        # An initialize round trip proves the stdio reader is up and blocked on stdin
+        proc.stdin.write(json.dumps(INITIALIZE).encode() + b"\n")
+        proc.stdin.flush()
+        for line in proc.stdout:
+            if line.startswith(b"{") and json.loads(line).get("id") == INITIALIZE["id"]:
+                break
+        else:
+            pytest.fail(f"server did not start: {proc.stderr.read().decode()}")
+
+        proc.send_signal(signal.SIGTERM)
+        assert proc.wait(timeout=5) == 0
+    finally:
+        if proc.poll() is None:
+            proc.kill()
+        proc.stdin.close()
+        proc.wait()
@@ -0,0 +1,93 @@
+"""
+Unit tests for the media download path in telegram_mcp.tools.media_tools.
+
+Telegram is replaced by small fakes; files are written to a temporary MediaStorage.
+
+Usage:
+    pytest tests/test_media_tools.py -v
+"""
+
+import asyncio
+import os
+from types import SimpleNamespace
+
+import pytest
+from telethon.tl.types import Document, GeoPointEmpty, MessageMediaDocument, MessageMediaGeo
+
+from telegram_mcp.tools import media_tools
+from telegram_mcp.utils.media_storage import MediaStorage
+
+
+def make_document_message(data: bytes):
+    document = Document(
+        id=1,
+        access_hash=1,
+        file_reference=b"",
+        date=None,
+        mime_type="application/pdf",
+        size=len(data),
+        dc_id=1,
+        attributes=[],
+    )
+    return SimpleNamespace(media=MessageMediaDocument(document=document))
+
+
+class SlowDownloadClient:
+    """Writes the payload one byte at a time, yielding in between, like a real download."""
+
+    def __init__(self, data: bytes):
+        self.data = data
+
+    async def download_media(self, message, file):
+        with open(file, "wb") as f:
+            for byte in self.data:
+                f.write(bytes((byte,)))
+                await asyncio.sleep(0)
+        return file
+
+
+class NothingToDownloadClient:
+    """Telethon returns None without creating a file for media such as locations."""
+
+    async def download_media(self, message, file):
+        return None
+
+
+@pytest.fixture
+def storage(tmp_path, monkeypatch):
+    storage = MediaStorage(str(tmp_path))
+    monkeypatch.setattr(media_tools, "media_storage", storage)
+    return storage
+
+
+# --- _store_media ---
+
+
+def test_store_media_concurrent_same_message(storage, monkeypatch):
+    """Two downloads of one message don't share a .part file, so the stored copy is intact."""
+    data = b"hello, telegram"
+    monkeypatch.setattr(media_tools, "client", SlowDownloadClient(data))
+    message = make_document_message(data)
+
+    async def download_twice():
+        return await asyncio.gather(
+            media_tools._store_media(9, 9, message), media_tools._store_media(9, 9, message)
+        )
+
+    first, second = asyncio.run(download_twice())
+
+    assert first["path"] == second["path"]
+    with open(first["path"], "rb") as f:
+        assert f.read() == data
+    assert not [name for name in os.listdir(storage.base_dir) if name.endswith(".part")]
+    assert storage.get_media(9, 9)["size"] == len(data)
+
+
+def test_store_media_without_file(storage, monkeypatch):
+    """Media with nothing to download yields None and leaves storage untouched."""
+    monkeypatch.setattr(media_tools, "client", NothingToDownloadClient())
+    message = SimpleNamespace(media=MessageMediaGeo(GeoPointEmpty()))
+
+    assert asyncio.run(media_tools._store_media(9, 10, message)) is None
+    assert storage.get_media(9, 10) is None
+    assert [name for name in os.listdir(storage.base_dir) if name != "index.json"] == []